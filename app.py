@@ -1,9 +1,7 @@
 import streamlit as st
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from vmr_client import VMR_BASE, get_vmr_client
 import re
 import io
 import time
@@ -14,7 +12,7 @@ from typing import List, Optional
 # 1. CORE LOGIC (Ported from VMR Script)
 # ==========================================
 
-BASE_URL = "https://cadprdwebw001.optus.com.au/vmr"
+BASE_URL = VMR_BASE
 
 @dataclass
 class CableData:
@@ -31,20 +29,14 @@ class CableData:
     junction_spares: int = 0
     status: str = "Processed"
 
-def make_session(timeout=30):
-    sess = requests.Session()
-    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retries)
-    sess.mount("http://", adapter)
-    sess.mount("https://", adapter)
-    sess.headers.update({"User-Agent": "VMR-Web-Crawler/1.0"})
-    return sess
+def make_session():
+    # Streamlit re-runs this script on every interaction but keeps imported
+    # modules, so the pooled client (and its open connections) outlives a run
+    return get_vmr_client(user_agent="VMR-Web-Crawler/1.0")
 
 def get_html(session, url, params=None):
     try:
-        r = session.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        return r.text
+        return session.get_html(url, params=params, timeout=10)
     except Exception:
         return ""
 
@@ -228,6 +220,7 @@ with col2:
             # Finalize
             progress_bar.empty()
             status_text.success(f"Completed! Processed {len(cables)} cables.")
+            st.caption(session.describe())
             
             # Create DataFrame
             df = pd.DataFrame(results)
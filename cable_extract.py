@@ -7,11 +7,29 @@ from tkinter import ttk, messagebox, filedialog
 DB_FILENAME = "database.db"   # change if your DB is elsewhere
 KEYWORD = ""               # searched (case-insensitive) within Cable.Name
 
+# FTS5 trigram index over Cable.NAME_KEY, built by the Fibre Database Update
+NAME_SEARCH_INDEX = "CableNameSearch"
+NAME_SEARCH_MIN_CHARS = 3  # shorter keywords contain no trigram to look up
 
-def fetch_rows(db_path: str, keyword: str):
+
+def _name_search_phrase(cur, keyword: str):
+    """MATCH phrase for `keyword` when the trigram index can answer it, else None."""
+    key = keyword.strip().upper()
+    if len(key) < NAME_SEARCH_MIN_CHARS:
+        return None
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (NAME_SEARCH_INDEX,))
+    if cur.fetchone() is None:
+        return None
+    return '"' + key.replace('"', '""') + '"'
+
+
+def fetch_rows(db_path: str, keyword: str, use_index: bool = True):
     """
     Returns list of tuples:
     (link1_name, link1_manhole, cable_name, cable_length, link2_name, link2_manhole, same_manhole)
+
+    Keywords of 3+ characters are looked up in the CableNameSearch index
+    when the database has one (use_index=False forces the scan).
     """
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"Database not found: {db_path}")
@@ -24,17 +42,44 @@ def fetch_rows(db_path: str, keyword: str):
         c.SPAN_LENGTH  AS CableLength,
         s2.Name        AS Link2Name,
         s2.MANHOLE     AS Link2Manhole
-    FROM Cable c
+    FROM {source}
     LEFT JOIN SpliceCases s1 ON s1.ID = c.LINK1
     LEFT JOIN SpliceCases s2 ON s2.ID = c.LINK2
-    WHERE c.Name LIKE '%' || ? || '%' COLLATE NOCASE
-    ORDER BY c.Name COLLATE NOCASE;
+    WHERE {where}
+    ORDER BY {order};
     """
     with sqlite3.connect(db_path) as conn:
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute(sql, (keyword,))
-        rows = cur.fetchall()
+        cable_cols = {r[1] for r in cur.execute("PRAGMA table_info(Cable)")}
+        phrase = _name_search_phrase(cur, keyword) if use_index and "NAME_KEY" in cable_cols else None
+        rows = None
+        if phrase is not None:
+            query = sql.format(
+                source=f"{NAME_SEARCH_INDEX} f JOIN Cable c ON c.rowid = f.rowid",
+                where=f"{NAME_SEARCH_INDEX} MATCH ?",
+                order="c.NAME_KEY",
+            )
+            try:
+                cur.execute(query, (phrase,))
+                rows = cur.fetchall()
+            except sqlite3.OperationalError:
+                # this SQLite build can't read the FTS5 table; scan instead
+                rows = None
+        if rows is None:
+            if "NAME_KEY" in cable_cols:
+                # NAME_KEY is the upper-cased name written by the Fibre Database Update
+                query = sql.format(source="Cable c", where="instr(c.NAME_KEY, ?) > 0", order="c.NAME_KEY")
+                param = keyword.strip().upper()
+            else:
+                query = sql.format(
+                    source="Cable c",
+                    where="c.Name LIKE '%' || ? || '%' COLLATE NOCASE",
+                    order="c.Name COLLATE NOCASE",
+                )
+                param = keyword
+            cur.execute(query, (param,))
+            rows = cur.fetchall()
 
     result = []
     for r in rows:
@@ -2,6 +2,7 @@ import os
 import json
 import sqlite3
 import hashlib
+import zlib
 import sys
 import traceback
 import csv
@@ -13,18 +14,29 @@ import tkinter.font as tkfont
 import webbrowser
 import requests
 import threading
+import itertools
+import struct
+import bisect
+import codecs
+import queue
+import math
 import tempfile
-import atexit
 import ctypes
+import multiprocessing
+import shutil
 
 # --- NEW/UPDATED: ADD after existing imports (BeautifulSoup already imported above) ---
 
 # ---------- VMR crawler (embedded; not a module import) ----------
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from urllib.parse import urlsplit
 
 # prefer lxml if present
 try:
@@ -33,33 +45,14 @@ try:
 except ImportError:
     _BS_PARSER = "html.parser"
 
-# same base host you already use elsewhere
-VMR_BASE = "https://cadprdwebw001.optus.com.au/vmr"
-
-def _vmr_make_session(timeout=20, total_retries=3, backoff=0.5) -> requests.Session:
-    sess = requests.Session()
-    retries = Retry(
-        total=total_retries,
-        backoff_factor=backoff,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=["GET", "HEAD", "OPTIONS"],
-        raise_on_status=False,
-    )
-    adapter = HTTPAdapter(max_retries=retries, pool_connections=5, pool_maxsize=10)
-    sess.mount("http://", adapter)
-    sess.mount("https://", adapter)
-    sess.headers.update({
-        "User-Agent": "FibreAssist-VMR/1.0 (+python-requests)",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    })
-    sess.request_timeout = timeout
-    return sess
+# optional: only the columnar snapshot export needs NumPy
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def _vmr_get_html(session: requests.Session, url: str, params=None) -> str:
-    r = session.get(url, params=params, timeout=session.request_timeout)
-    r.raise_for_status()
-    r.encoding = r.apparent_encoding or "utf-8"
-    return r.text
+# every VMR request goes through the shared pooled client
+from vmr_client import VMR_BASE, get_vmr_client
 
 def _vmr_crawl_fibretrace(vmr_numeric_id: str, out_dir: str = "_fibre_cache") -> Path:
     """Implements steps 2–7; returns saved HTML file path."""
@@ -67,11 +60,11 @@ def _vmr_crawl_fibretrace(vmr_numeric_id: str, out_dir: str = "_fibre_cache") ->
         raise ValueError("VMR ID must be numeric.")
     vmr_id = vmr_numeric_id.strip()
 
-    sess = _vmr_make_session()
+    client = get_vmr_client()
 
     # Step 2: Result.aspx
     result_url = f"{VMR_BASE}/Result.aspx"
-    html2 = _vmr_get_html(sess, result_url, params={"keywords": f"70|{vmr_id}"})
+    html2 = client.get_html(result_url, params={"keywords": f"70|{vmr_id}"}, timeout=20)
 
     # Step 3: WorkFolder.aspx?id=<NUM>
     work_id = None
@@ -88,7 +81,7 @@ def _vmr_crawl_fibretrace(vmr_numeric_id: str, out_dir: str = "_fibre_cache") ->
 
     # Step 4: WorkFolder.aspx
     work_url = f"{VMR_BASE}/WorkFolder.aspx"
-    html4 = _vmr_get_html(sess, work_url, params={"id": work_id})
+    html4 = client.get_html(work_url, params={"id": work_id}, timeout=20)
 
     # Step 5: setFibreTrace('<FT_ID>',0)
     m = re.search(r"setFibreTrace\(\s*'([^']+)'\s*,\s*0\s*\)", html4, re.IGNORECASE)
@@ -104,7 +97,7 @@ def _vmr_crawl_fibretrace(vmr_numeric_id: str, out_dir: str = "_fibre_cache") ->
     # Step 6: FibreTrace.aspx?id=<FT_ID>:0:A
     fibre_url = f"{VMR_BASE}/FibreTrace.aspx"
     fibre_param = f"{ft_id}:0:A"
-    html6 = _vmr_get_html(sess, fibre_url, params={"id": fibre_param})
+    html6 = client.get_html(fibre_url, params={"id": fibre_param}, timeout=20)
 
     # Step 7: save (put alongside app so .exe can read it)
     try:
@@ -155,7 +148,7 @@ except Exception:
 
 # >>> NEW: cross-section helpers (single source of truth for parse/filter/alerts)
 
-VMR_BASE_URL = "https://cadprdwebw001.optus.com.au/vmr/"
+VMR_BASE_URL = VMR_BASE + "/"
 VMR_Cable_URL = VMR_BASE_URL + "CrossSectionReview.aspx?id="
 
 def _html_clean(text):
@@ -316,11 +309,24 @@ def rows_have_alert(headers, rows_subset):
             return True
     return False
 
-# >>> NEW: simple temp-file cache so we never re-crawl after Process click
+# >>> NEW/UPDATED: cross-section cache kept next to the app and reused across runs.
+# Each page expires after its TTL; once the pages add up to more than max_bytes
+# the least recently used ones are evicted. Page metadata lives in a small SQLite
+# store (WAL) so every update is one short transaction, safe from crawler threads.
+# Parsed tables are kept there too, zlib-packed and keyed by the page's content
+# hash, so a cached page is parsed at most once per parser.
+CS_CACHE_TTL = 12 * 3600                     # seconds a fetched page stays fresh
+CS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+CS_CACHE_DB = "cache.db"
+CS_CACHE_SCHEMA = 2
+# bump when a cross-section parser changes its output, so stored tables are re-parsed
+CS_PARSER_VERSION = 1
+
+def _parser_key(parser):
+    return f"{parser.__name__}@{CS_PARSER_VERSION}"
 
-# >>> NEW/UPDATED: simple temp-file cache so we never re-crawl after Process click
 class CrossSectionCache:
-    def __init__(self):
+    def __init__(self, cache_dir=None, ttl=CS_CACHE_TTL, max_bytes=CS_CACHE_MAX_BYTES):
         # Put cache next to the running app (works for .exe and .py)
         try:
             if getattr(sys, "frozen", False):
@@ -331,193 +337,2704 @@ class CrossSectionCache:
         except Exception:
             base_dir = os.getcwd()
 
-        self.cache_dir = os.path.join(base_dir, "_fibre_cache")
+        self.cache_dir = cache_dir or os.path.join(base_dir, "_fibre_cache")
         os.makedirs(self.cache_dir, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
 
-        self.index_file = os.path.join(self.cache_dir, "index.json")
-        self._index = self._load_index()
-        atexit.register(self.clear)
-
-    def _load_index(self):
-        if os.path.exists(self.index_file):
+        self.db_file = os.path.join(self.cache_dir, CS_CACHE_DB)
+        # one connection shared by the crawler threads, serialised by the lock
+        self._lock = threading.RLock()
+        try:
+            self._db = self._open_store()
+        except sqlite3.DatabaseError:
+            # a damaged store only holds cache metadata: start again
+            self._remove_store()
+            self._db = self._open_store()
+        self._migrate_index_json(os.path.join(self.cache_dir, "index.json"))
+        self.reset_stats()
+
+    def _store_files(self):
+        return [self.db_file + suffix for suffix in ("", "-wal", "-shm")]
+
+    def _remove_store(self):
+        for fp in self._store_files():
             try:
-                with open(self.index_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+                os.remove(fp)
+            except OSError:
+                pass
 
-    def _save_index(self):
+    def _open_store(self):
+        # autocommit: single statements commit on their own, multi-statement
+        # updates are wrapped in BEGIN IMMEDIATE ... COMMIT
+        conn = sqlite3.connect(self.db_file, timeout=10, isolation_level=None, check_same_thread=False)
         try:
-            with open(self.index_file, "w", encoding="utf-8") as f:
-                json.dump(self._index, f)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                conn.executescript("""
+                    BEGIN IMMEDIATE;
+                    CREATE TABLE IF NOT EXISTS pages (
+                        seg_id TEXT PRIMARY KEY,
+                        path TEXT NOT NULL,
+                        headers TEXT,
+                        rows_len INTEGER,
+                        fetched_at REAL NOT NULL DEFAULT 0,
+                        expires_at REAL NOT NULL DEFAULT 0,
+                        last_used REAL NOT NULL DEFAULT 0,
+                        size INTEGER NOT NULL DEFAULT 0
+                    );
+                    CREATE INDEX IF NOT EXISTS ix_pages_last_used ON pages(last_used);
+                    CREATE TABLE IF NOT EXISTS tray_alerts (
+                        seg_id TEXT NOT NULL,
+                        tray TEXT NOT NULL,
+                        has_alert INTEGER NOT NULL,
+                        PRIMARY KEY (seg_id, tray)
+                    ) WITHOUT ROWID;
+                    PRAGMA user_version = 1;
+                    COMMIT;
+                """)
+            if version < 2:
+                conn.executescript("""
+                    BEGIN IMMEDIATE;
+                    ALTER TABLE pages ADD COLUMN content_hash TEXT;
+                    CREATE TABLE IF NOT EXISTS parsed_tables (
+                        content_hash TEXT NOT NULL,
+                        parser TEXT NOT NULL,
+                        data BLOB NOT NULL,
+                        PRIMARY KEY (content_hash, parser)
+                    ) WITHOUT ROWID;
+                    PRAGMA user_version = 2;
+                    COMMIT;
+                """)
+            # tables from another parser version, and the tray alerts taken from them, are stale
+            current = f"%@{CS_PARSER_VERSION}"
+            if conn.execute("SELECT 1 FROM parsed_tables WHERE parser NOT LIKE ? LIMIT 1", (current,)).fetchone():
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM parsed_tables WHERE parser NOT LIKE ?", (current,))
+                conn.execute("DELETE FROM tray_alerts")
+                conn.execute("COMMIT")
         except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _migrate_index_json(self, index_file):
+        # one-time import of the index.json the cache used to rewrite on every change
+        if not os.path.exists(index_file):
+            return
+        try:
+            with open(index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except Exception:
+            index = {}
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for seg_id, meta in (index if isinstance(index, dict) else {}).items():
+                    if not isinstance(meta, dict) or not meta.get("path"):
+                        continue
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO pages (seg_id, path, headers, rows_len, fetched_at, expires_at, last_used, size) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (seg_id, meta["path"], json.dumps(meta.get("headers") or []), meta.get("rows_len", 0),
+                         meta.get("fetched_at", 0), meta.get("expires_at", 0),
+                         meta.get("last_used", 0), meta.get("size", 0)),
+                    )
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO tray_alerts VALUES (?, ?, ?)",
+                        [(seg_id, t, int(bool(v))) for t, v in (meta.get("has_alert_by_tray") or {}).items()],
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        try:
+            os.remove(index_file)
+        except OSError:
             pass
 
+    def close(self):
+        with self._lock:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+
     def _path_for(self, seg_id: str) -> str:
-        # canonical filename used for direct fallback
+        # one file per segment, overwritten on refresh
         safe = str(seg_id).strip()
         return os.path.join(self.cache_dir, f"{safe}.html")
 
+    def _fresh_path(self, seg_id, now=None):
+        # path of an unexpired cached page, else None
+        # (pages imported from index.json without expires_at count as stale)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path FROM pages WHERE seg_id = ? AND expires_at > ?", (seg_id, now or time.time())
+            ).fetchone()
+        return row[0] if row and os.path.exists(row[0]) else None
+
+    @staticmethod
+    def _pack_table(headers, rows):
+        return zlib.compress(json.dumps([headers or [], rows or []], separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def _unpack_table(blob):
+        headers, rows = json.loads(zlib.decompress(blob))
+        return headers, rows
+
+    def _drop(self, seg_id, path):
+        self._db.execute("DELETE FROM pages WHERE seg_id = ?", (seg_id,))
+        self._db.execute("DELETE FROM tray_alerts WHERE seg_id = ?", (seg_id,))
+        try:
+            os.remove(path or self._path_for(seg_id))
+        except OSError:
+            pass
+
+    def reset_stats(self):
+        self.hits = self.misses = self.expired = self.evicted = 0
+
+    def stats(self):
+        with self._lock:
+            pages, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "pages": pages,
+                "bytes": size,
+            }
+
+    def describe(self):
+        s = self.stats()
+        return (f"Cross-section cache: {s['hits']} hits, {s['misses']} misses "
+                f"({s['expired']} expired), {s['evicted']} evicted; "
+                f"{s['pages']} pages, {s['bytes'] / (1024 * 1024):.1f} MB")
+
     def clear(self):
-        # Remove cached files when Process is clicked again or app closes
+        # Remove every cached page (the cache otherwise persists between runs)
         try:
-            for name in os.listdir(self.cache_dir):
-                fp = os.path.join(self.cache_dir, name)
-                try:
-                    os.remove(fp)
-                except Exception:
-                    pass
-            self._index.clear()
-            self._save_index()
+            with self._lock:
+                keep = set(self._store_files())
+                for name in os.listdir(self.cache_dir):
+                    fp = os.path.join(self.cache_dir, name)
+                    if fp in keep:
+                        continue
+                    try:
+                        os.remove(fp)
+                    except Exception:
+                        pass
+                self._db.executescript(
+                    "BEGIN IMMEDIATE; DELETE FROM pages; DELETE FROM tray_alerts; DELETE FROM parsed_tables; COMMIT;"
+                )
         except Exception:
             pass
 
-    def put_html(self, seg_id, html_text):
+    def prune(self):
+        """Drop expired pages, then evict least recently used ones down to max_bytes."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                stale = self._db.execute(
+                    "SELECT seg_id, path FROM pages WHERE expires_at <= ?", (time.time(),)
+                ).fetchall()
+                for seg_id, path in stale:
+                    self._drop(seg_id, path)
+                self._evict()
+                self._db.execute(
+                    "DELETE FROM parsed_tables WHERE content_hash NOT IN "
+                    "(SELECT content_hash FROM pages WHERE content_hash IS NOT NULL)"
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _evict(self, keep=None):
+        # caller holds the lock and an open transaction
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        lru = self._db.execute("SELECT seg_id, path, size FROM pages ORDER BY last_used").fetchall()
+        for seg_id, path, size in lru:
+            if total <= self.max_bytes:
+                break
+            if seg_id == keep:
+                continue
+            total -= size
+            self._drop(seg_id, path)
+            self.evicted += 1
+
+    def put_html(self, seg_id, html_text, ttl=None):
         path = self._path_for(seg_id)
+        data = html_text.encode("utf-8")
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(html_text)
+            with open(path, "wb") as f:
+                f.write(data)
         except Exception:
-            return [], []
-        headers, rows = parse_gridview2(html_text)
-        self._index[seg_id] = {
-            "path": path,
-            "headers": headers,
-            "rows_len": len(rows),
-            "has_alert_by_tray": {}
-        }
-        self._save_index()
+            # not cached, but the caller still gets the table
+            return parse_gridview2(html_text)
+        content_hash = hashlib.sha1(data).hexdigest()
+        # an unchanged page (same content hash) reuses the table parsed last time
+        with self._lock:
+            packed = self._db.execute(
+                "SELECT data FROM parsed_tables WHERE content_hash = ? AND parser = ?",
+                (content_hash, _parser_key(parse_gridview2)),
+            ).fetchone()
+        if packed:
+            headers, rows = self._unpack_table(packed[0])
+        else:
+            headers, rows = parse_gridview2(html_text)
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages (seg_id, path, headers, rows_len, fetched_at, expires_at, "
+                    "last_used, size, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (seg_id, path, json.dumps(headers), len(rows), now,
+                     now + (self.ttl if ttl is None else ttl), now, len(data), content_hash),
+                )
+                if not packed:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO parsed_tables VALUES (?, ?, ?)",
+                        (content_hash, _parser_key(parse_gridview2), self._pack_table(headers, rows)),
+                    )
+                self._db.execute("DELETE FROM tray_alerts WHERE seg_id = ?", (seg_id,))
+                self._evict(keep=seg_id)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
         return headers, rows
 
     def has(self, seg_id):
-        # robust check: prefer on-disk presence
-        path = self._path_for(seg_id)
-        if os.path.exists(path):
+        """True if a fresh copy of the page is cached."""
+        return self._fresh_path(seg_id) is not None
+
+    def fresh(self, seg_id):
+        """Like has(), but counted as a cache hit or miss and marks the page used."""
+        now = time.time()
+        with self._lock:
+            if self._fresh_path(seg_id, now):
+                self.hits += 1
+                self._db.execute("UPDATE pages SET last_used = ? WHERE seg_id = ?", (now, seg_id))
+                return True
+            self.misses += 1
+            if self._db.execute("SELECT 1 FROM pages WHERE seg_id = ?", (seg_id,)).fetchone():
+                self.expired += 1
+            return False
+
+    def _read_html(self, seg_id):
+        p = self._fresh_path(seg_id)
+        if not p:
+            return None
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                return f.read()
+        except Exception:
+            return None
+
+    def get_html(self, seg_id):
+        """Cached page text, or None if it is missing or expired (counted as a hit / miss)."""
+        return self._read_html(seg_id) if self.fresh(seg_id) else None
+
+    def table_for(self, seg_id, parser=parse_gridview2):
+        """
+        (headers, rows) of a fresh cached page as produced by `parser`. Served
+        from the stored table for the page's content hash; the HTML is only
+        parsed (once) when no table exists yet for that hash and parser.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT p.content_hash, t.data FROM pages p LEFT JOIN parsed_tables t "
+                "ON t.content_hash = p.content_hash AND t.parser = ? "
+                "WHERE p.seg_id = ? AND p.expires_at > ?",
+                (_parser_key(parser), seg_id, time.time()),
+            ).fetchone()
+        if not row:
+            return [], []
+        if row[1] is not None:
+            return self._unpack_table(row[1])
+        html = self._read_html(seg_id)
+        if not html:
+            return [], []
+        # pages imported from index.json have no content hash yet
+        content_hash = row[0] or hashlib.sha1(html.encode("utf-8")).hexdigest()
+        headers, rows = parser(html)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("UPDATE pages SET content_hash = ? WHERE seg_id = ?", (content_hash, seg_id))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO parsed_tables VALUES (?, ?, ?)",
+                    (content_hash, _parser_key(parser), self._pack_table(headers, rows)),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return headers or [], rows or []
+
+    def headers_for(self, seg_id):
+        return self.table_for(seg_id)[0]
+
+    def rows_for(self, seg_id):
+        """
+        Return the parsed rows for a cached seg_id (parsed from HTML only if no table is stored).
+        """
+        return self.table_for(seg_id)[1]
+
+    def set_tray_alert(self, seg_id, tray_str, flag):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tray_alerts SELECT seg_id, ?, ? FROM pages WHERE seg_id = ?",
+                (tray_str, int(bool(flag)), seg_id),
+            )
+
+    def fill_tray_alerts(self, seg_id, trays):
+        """Record the alert flag for any of `trays` a cached page was not yet checked for."""
+        with self._lock:
+            known = {t for (t,) in self._db.execute("SELECT tray FROM tray_alerts WHERE seg_id = ?", (seg_id,))}
+        missing = [t for t in trays if t not in known]
+        if not missing:
+            return
+        headers, rows = self.table_for(seg_id)
+        for t in missing:
+            self.set_tray_alert(seg_id, t, rows_have_alert(headers, filter_rows_by_tray_range(rows, t)))
+
+    def tray_has_alert(self, seg_id, tray_str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT a.has_alert FROM tray_alerts a JOIN pages p USING (seg_id) "
+                "WHERE a.seg_id = ? AND a.tray = ? AND p.expires_at > ?",
+                (seg_id, tray_str, time.time()),
+            ).fetchone()
+        return bool(row and row[0])
+
+# >>> NEW: concurrent cross-section crawl (Fibre Check step 4)
+CRAWL_MAX_WORKERS = 8
+CRAWL_PER_HOST = 4       # simultaneous requests to one VMR host
+CRAWL_TIMEOUT = 15
+CRAWL_POLL_MS = 50
+
+def crawl_cross_sections(jobs, cache, trays_by_seg, events, max_workers=CRAWL_MAX_WORKERS,
+                         per_host=CRAWL_PER_HOST, client=None, timeout=CRAWL_TIMEOUT):
+    """
+    Fetch the cross-section page of every (seg_id, url) in `jobs` on a
+    thread pool, with at most `per_host` requests in flight per host. Each
+    page is parsed into `cache` as soon as it arrives and the DWDM/T_ alert
+    recorded for every tray range in trays_by_seg[seg_id].
+
+    Puts one (seg_id, error) on the `events` queue per job as it finishes
+    (error is None on success). Blocks until every job is done, so run it
+    on a worker thread and drain `events` from the Tk thread.
+    """
+    client = client or get_vmr_client()
+    slots = {}
+    slots_lock = threading.Lock()
+
+    def host_slot(url):
+        host = urlsplit(url).netloc
+        with slots_lock:
+            return slots.setdefault(host, threading.BoundedSemaphore(max(1, per_host)))
+
+    def fetch(seg_id, url):
+        try:
+            with host_slot(url):
+                resp = client.get(url, timeout=timeout)
+            if resp.status_code != 200:
+                return f"HTTP {resp.status_code}"
+            headers, rows = cache.put_html(seg_id, resp.text)
+            for tray in trays_by_seg.get(seg_id, ()):
+                cache.set_tray_alert(seg_id, tray, rows_have_alert(headers, filter_rows_by_tray_range(rows, tray)))
+            return None
+        except Exception as e:
+            return str(e) or type(e).__name__
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(fetch, seg_id, url): seg_id for seg_id, url in jobs}
+        for future in as_completed(futures):
+            events.put((futures[future], future.result()))
+
+########################################################################
+# REUSABLE DOWNLOAD LOGIC
+########################################################################
+
+# (connect, read) timeouts; the read timeout is per socket read, not per file
+DOWNLOAD_TIMEOUT = (10, 60)
+DOWNLOAD_MIN_CHUNK = 64 * 1024
+DOWNLOAD_MAX_CHUNK = 4 * 1024 * 1024
+# chunk size is doubled / halved to keep each read around this long
+DOWNLOAD_CHUNK_TARGET_SECONDS = 0.25
+
+def make_download_session(proxies=None, pool_size=4, connect_retries=2, backoff=0.5):
+    """
+    Pooled session for the GeoJSON downloads: connections (and the proxy
+    tunnel) are reused across files and threads. Only connection errors
+    are retried here; an interrupted body is resumed by download_file.
+    """
+    sess = requests.Session()
+    retries = Retry(total=connect_retries, connect=connect_retries, read=0, status=0, backoff_factor=backoff)
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+    sess.mount("http://", adapter)
+    sess.mount("https://", adapter)
+    if proxies:
+        sess.proxies.update(proxies)
+    return sess
+
+def _download_meta_path(destination):
+    return destination + '.meta.json'
+
+def _load_download_meta(destination):
+    try:
+        with open(_download_meta_path(destination), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if isinstance(meta, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _save_download_meta(destination, meta):
+    path = _download_meta_path(destination)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+def _validators(response):
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+def _content_range_total(value):
+    # "bytes 100-199/1234" -> (100, 1234); total is None for "*"
+    m = re.match(r'bytes\s+(\d+)-\d+/(\d+|\*)', value or '')
+    if not m:
+        return None, None
+    return int(m.group(1)), (None if m.group(2) == '*' else int(m.group(2)))
+
+def download_file(
+    url, 
+    destination, 
+    proxies, 
+    retry_count=0, 
+    on_success=None, 
+    on_progress=None,
+    on_error=None,
+    on_not_modified=None,
+    on_chunk=None,
+    session=None,
+    timeout=DOWNLOAD_TIMEOUT,
+    resume=True
+):
+    """
+    Download a file with progress reporting and error handling.
+
+    Data goes to `destination + '.part'` and is renamed over `destination`
+    only once complete. ETag / Last-Modified are kept in a sidecar
+    `destination + '.meta.json'`, used to
+      - resume an interrupted .part with Range + If-Range, and
+      - revalidate a finished file with If-None-Match / If-Modified-Since;
+        on 304 the file is left alone and on_not_modified (or on_success)
+        is called.
+    on_chunk(data) sees every body chunk as it is written; callers that
+    consume the stream pass resume=False so it always starts at byte zero.
+    """
+    http = session or requests
+    part_path = destination + '.part'
+    meta = _load_download_meta(destination)
+    # byte offsets must refer to the file itself, not a gzip encoding of it
+    headers = {'Accept-Encoding': 'identity'}
+
+    part = meta.get('part') or {}
+    part_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    resume_validator = part.get('etag') or part.get('last_modified')
+    if resume and part_size and part.get('url') == url and resume_validator and not resume_validator.startswith('W/'):
+        headers['Range'] = f'bytes={part_size}-'
+        headers['If-Range'] = resume_validator
+    elif os.path.exists(destination) and meta.get('url') == url \
+            and meta.get('size') == os.path.getsize(destination):
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        response = http.get(url, stream=True, proxies=proxies, timeout=timeout, headers=headers)
+        with response:
+            if response.status_code == 304:
+                if on_progress:
+                    on_progress(destination, 100.0)
+                callback = on_not_modified or on_success
+                if callback:
+                    callback(destination)
+                return True
+
+            if response.status_code == 416 and 'Range' in headers and retry_count < 1:
+                # stale .part (server copy shrank); start over
+                os.remove(part_path)
+                meta.pop('part', None)
+                _save_download_meta(destination, meta)
+                return download_file(
+                    url, destination, proxies, retry_count + 1,
+                    on_success, on_progress, on_error, on_not_modified, on_chunk, session, timeout
+                )
+
+            if response.status_code == 206:
+                start, total_size = _content_range_total(response.headers.get('Content-Range'))
+                if start != part_size:
+                    raise IOError(f"server resumed at byte {start}, expected {part_size}")
+                mode = 'ab'
+                downloaded_size = part_size
+            elif response.status_code == 200:
+                total_size = int(response.headers.get('content-length', 0)) or None
+                mode = 'wb'
+                downloaded_size = 0
+                meta['part'] = dict(_validators(response), url=url)
+                _save_download_meta(destination, meta)
+            else:
+                error_msg = (
+                    f"Failed to download {destination}. "
+                    f"HTTP status code: {response.status_code}"
+                )
+                if on_error:
+                    on_error(error_msg)
+                return False
+
+            chunk_size = DOWNLOAD_MIN_CHUNK
+            with open(part_path, mode) as file:
+                while True:
+                    t0 = time.perf_counter()
+                    chunk = response.raw.read(chunk_size, decode_content=True)
+                    if not chunk:
+                        break
+                    file.write(chunk)
+                    downloaded_size += len(chunk)
+                    if on_chunk:
+                        on_chunk(chunk)
+                    if total_size and on_progress:
+                        progress_pct = (downloaded_size / total_size) * 100
+                        on_progress(destination, progress_pct)
+                    elapsed = time.perf_counter() - t0
+                    if elapsed < DOWNLOAD_CHUNK_TARGET_SECONDS / 2 and len(chunk) == chunk_size:
+                        chunk_size = min(chunk_size * 2, DOWNLOAD_MAX_CHUNK)
+                    elif elapsed > DOWNLOAD_CHUNK_TARGET_SECONDS * 2:
+                        chunk_size = max(chunk_size // 2, DOWNLOAD_MIN_CHUNK)
+                file.flush()
+                os.fsync(file.fileno())
+
+            if total_size and downloaded_size != total_size:
+                # keep the .part; the next attempt resumes from here
+                raise IOError(f"connection closed after {downloaded_size} of {total_size} bytes")
+
+            os.replace(part_path, destination)
+            finished = dict(meta.pop('part', {}), size=downloaded_size)
+            finished['url'] = url
+            _save_download_meta(destination, finished)
+
+        if on_success:
+            on_success(destination)
+        return True
+    except Exception as e:
+        if on_error:
+            on_error(f"Error downloading {destination}: {e}")
+    return False
+
+########################################################################
+# STREAMING GEOJSON READER
+########################################################################
+
+_JSON_WS_RE = re.compile(r"\s*")
+
+def _read_text_chunks(path, encoding, chunk_size=1 << 20):
+    with open(path, 'r', encoding=encoding) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def _iter_geojson_features_from_chunks(chunks):
+    """
+    Yield the features of a FeatureCollection one at a time from an iterable
+    of text chunks. Only the feature being decoded and one read buffer are
+    held in memory, so file size does not drive peak memory.
+    Raises json.JSONDecodeError on malformed input, like json.load().
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def peek():
+        # next non-whitespace character (None at end of input)
+        nonlocal pos
+        while True:
+            pos = _JSON_WS_RE.match(buf, pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return None
+
+    def expect(ch):
+        nonlocal pos
+        if peek() != ch:
+            raise json.JSONDecodeError(f"Expecting '{ch}'", buf, pos)
+        pos += 1
+
+    def value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # a value ending exactly at the buffer edge may be truncated (e.g. a number)
+                if end < len(buf) or eof:
+                    pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    expect("{")
+    while peek() != "}":
+        key = value()
+        expect(":")
+        if key != "features":
+            value()
+        else:
+            expect("[")
+            if peek() == "]":
+                return
+            while True:
+                yield value()
+                c = peek()
+                if c == "]":
+                    return
+                if c != ",":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+                pos += 1
+        if peek() == ",":
+            pos += 1
+        elif peek() != "}":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+
+def iter_geojson_features(path, encoding='utf-8', chunk_size=1 << 20):
+    """Stream the features of a GeoJSON file without loading the whole file."""
+    return _iter_geojson_features_from_chunks(_read_text_chunks(path, encoding, chunk_size))
+
+def open_feature_source(source, encoding, on_read=None):
+    """
+    Features from a GeoJSON path, or `source` itself when it is already an
+    iterable of features. on_read(n) is told how much of a file has been read.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        return source
+    chunks = _read_text_chunks(source, encoding)
+    if on_read:
+        chunks = _count_chunks(chunks, on_read)
+    return _iter_geojson_features_from_chunks(chunks)
+
+def _count_chunks(chunks, on_read):
+    # the inputs are single-byte encodings, so characters == bytes
+    for chunk in chunks:
+        on_read(len(chunk))
+        yield chunk
+
+def _peak_rss_bytes():
+    """Best-effort peak resident set size of this process in bytes, or None."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except Exception:
+        pass
+    return None
+
+########################################################################
+# DOWNLOAD & UPDATE PIPELINE
+########################################################################
+
+# download -> (raw chunks) -> parse -> (feature batches) -> SQLite upsert;
+# the queues are bounded so a slow stage holds back the ones before it.
+PIPELINE_QUEUE_CHUNKS = 16
+PIPELINE_QUEUE_BATCHES = 8
+PIPELINE_BATCH_FEATURES = 1000
+
+_END = object()
+
+class DownloadError(IOError):
+    """A streamed download failed; the features already yielded are incomplete."""
+
+def _put_until(q, item, stop):
+    # put that gives up once `stop` is set, so an abandoned reader can't wedge the writer
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
             return True
-        meta = self._index.get(seg_id)
-        return bool(meta) and os.path.exists(meta.get("path", ""))
+        except queue.Full:
+            pass
+    return False
+
+def iter_downloaded_features(url, destination, proxies, encoding, session=None,
+                             on_progress=None, maxsize=PIPELINE_QUEUE_CHUNKS):
+    """
+    Download `url` to `destination` and yield its GeoJSON features while the
+    bytes are still arriving. The file is still written (and its ETag kept),
+    so a later 304 parses the local copy instead.
+    Raises DownloadError when the transfer fails part-way.
+    """
+    chunks = queue.Queue(maxsize)
+    stop = threading.Event()
+    outcome = {}
+
+    def on_chunk(data):
+        if not _put_until(chunks, data, stop):
+            raise DownloadError("download abandoned by the reader")
+
+    def worker():
+        download_file(
+            url, destination, proxies,
+            on_progress=on_progress,
+            on_error=lambda msg: outcome.setdefault('error', msg),
+            on_not_modified=lambda _dest: outcome.setdefault('not_modified', True),
+            on_chunk=on_chunk,
+            session=session,
+            resume=False
+        )
+        _put_until(chunks, _END, stop)
+
+    def text_chunks(item):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        while item is not _END:
+            text = decoder.decode(item)
+            if text:
+                yield text
+            item = chunks.get()
+        if 'error' in outcome:
+            raise DownloadError(outcome['error'])
+        yield decoder.decode(b'', final=True)
+
+    threading.Thread(target=worker, daemon=True).start()
+    try:
+        first = chunks.get()
+        if first is _END and outcome.get('not_modified'):
+            yield from iter_geojson_features(destination, encoding=encoding)
+        else:
+            yield from _iter_geojson_features_from_chunks(text_chunks(first))
+    finally:
+        stop.set()
+
+def prefetch_features(features, maxsize=PIPELINE_QUEUE_BATCHES, batch_size=PIPELINE_BATCH_FEATURES):
+    """
+    Iterate `features` (parse stage) on a background thread and yield them
+    here, handed over in batches through a bounded queue. Exceptions from
+    the parse stage are re-raised in the consumer.
+    """
+    batches = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def worker():
+        try:
+            for batch in _batched(features, batch_size):
+                if not _put_until(batches, batch, stop):
+                    return
+            _put_until(batches, _END, stop)
+        except BaseException as e:
+            _put_until(batches, e, stop)
+        finally:
+            close = getattr(features, 'close', None)
+            if close:
+                close()
+
+    threading.Thread(target=worker, daemon=True).start()
+    try:
+        while True:
+            item = batches.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+    finally:
+        stop.set()
+
+########################################################################
+# INGEST PROGRESS
+########################################################################
+
+INGEST_PROGRESS_INTERVAL = 0.25
+INGEST_POLL_MS = 100
+
+INGEST_PHASES = {
+    'prepare': "Preparing database",
+    'cable': "Cable",
+    'splicecases': "Splice cases",
+    'history': "Snapshot history",
+    'index': "Spatial / name indexes",
+    'commit': "Committing",
+    'export': "Columnar export",
+}
+
+class IngestCancelled(Exception):
+    """
+    The update was cancelled; it was rolled back and database_new.db removed.
+    schema_upgraded is True when the live database.db had already been
+    migrated (migrations commit before the cancellable data transaction).
+    """
+
+    def __init__(self, schema_upgraded=False):
+        super().__init__()
+        self.schema_upgraded = schema_upgraded
+
+class IngestProgress:
+    """
+    Feature / byte counters for one ingest. Posts throttled progress events
+    {'phase', 'features', 'rate', 'eta', 'elapsed'} to `callback` and raises
+    IngestCancelled between features once `cancel` is set. ETA is only known
+    when every input is a file (`total_bytes`).
+    """
+
+    def __init__(self, callback=None, cancel=None, total_bytes=None, interval=INGEST_PROGRESS_INTERVAL):
+        self.callback = callback
+        self.cancel = cancel
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.bytes_read = 0
+        self.features = 0
+        self.phase = None
+        self.started = time.perf_counter()
+        self._last_post = 0.0
+
+    def check_cancel(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise IngestCancelled()
+
+    def set_phase(self, phase):
+        self.check_cancel()
+        self.phase = phase
+        self.post()
+
+    def on_read(self, nbytes):
+        self.bytes_read += nbytes
+
+    def track(self, features):
+        """Pass `features` through, counting them."""
+        for feature in features:
+            self.features += 1
+            if self.features % 500 == 0:
+                self.check_cancel()
+                if time.perf_counter() - self._last_post >= self.interval:
+                    self.post()
+            yield feature
+
+    def post(self):
+        if not self.callback:
+            return
+        now = time.perf_counter()
+        self._last_post = now
+        elapsed = now - self.started
+        eta = None
+        if self.total_bytes and self.bytes_read and self.phase in ('cable', 'splicecases'):
+            remaining = max(0, self.total_bytes - self.bytes_read)
+            eta = elapsed * remaining / self.bytes_read
+        self.callback({
+            'phase': self.phase,
+            'features': self.features,
+            'rate': self.features / elapsed if elapsed > 0 else 0.0,
+            'eta': eta,
+            'elapsed': elapsed,
+        })
+
+def format_ingest_progress(event):
+    """One-line status text for an IngestProgress event."""
+    text = (
+        f"{INGEST_PHASES.get(event['phase'], event['phase'])}: "
+        f"{event['features']:,} features ({event['rate']:,.0f}/s)"
+    )
+    if event.get('eta') is not None:
+        minutes, seconds = divmod(int(event['eta'] + 0.5), 60)
+        text += f" - about {minutes}:{seconds:02d} left"
+    return text
+
+########################################################################
+# BULK UPSERT ENGINE
+########################################################################
+
+# GeoJSON property columns, in table order
+CABLE_COLUMNS = (
+    'NAME', 'CABLE_STATUS', 'FIBRES', 'OWNER', 'SPAN_LENGTH',
+    'IOF', 'PROTECTED', 'LINK1', 'LINK2', 'EO', 'ID',
+    'SEGMENT_ID', 'BUILD_DATE', 'CONSTRUCT_TYPE',
+)
+SPLICECASE_COLUMNS = (
+    'NAME', 'ADDRESS', 'SUBURB', 'BUTTSPLICE', 'RESTRICTED',
+    'RS_CODE', 'RS_COMMENTS', 'MODEL', 'MANHOLE', 'OWNER',
+    'VMR_LINK', 'EO', 'BUILDDATE', 'JOBNUMBER', 'ID',
+)
+# Columns outside the hash; a change in these counts as "updated"
+CABLE_TRACKED_COLUMNS = ('CABLE_STATUS', 'FIBRES', 'PROTECTED')
+SPLICECASE_TRACKED_COLUMNS = ('RESTRICTED', 'RS_CODE', 'RS_COMMENTS', 'VMR_LINK')
+# Classification flags computed at ingest (see FEATURE CLASSIFICATION); the
+# ones that depend on tracked columns are rewritten when those change
+CABLE_FLAG_COLUMNS = ('IS_FSS', 'IS_IOF', 'IS_DECOMMISSIONING', 'IS_FOREIGN_OWNED')
+SPLICECASE_FLAG_COLUMNS = (
+    'JOINT_TYPE', 'IS_BUTT_SPLICE', 'IS_RESTRICTED',
+    'IN_SUBSTATION', 'IN_CITIPOWER', 'IN_ETSA', 'IN_TUNNEL',
+)
+# Full upsert row: properties, then columns derived at ingest
+BBOX_COLUMNS = ('MIN_LON', 'MIN_LAT', 'MAX_LON', 'MAX_LAT')
+CABLE_ROW_COLUMNS = (
+    CABLE_COLUMNS + ('NAME_KEY',) + CABLE_FLAG_COLUMNS + BBOX_COLUMNS + ('geometry', 'generated_id')
+)
+SPLICECASE_ROW_COLUMNS = (
+    SPLICECASE_COLUMNS + ('NAME_KEY',) + SPLICECASE_FLAG_COLUMNS + BBOX_COLUMNS + ('geometry', 'generated_id')
+)
+
+UPSERT_BATCH_SIZE = 5000
+CHANGE_LOG_RETENTION_DAYS = 90
+
+def create_network_tables(cursor):
+    """Create the Cable / SpliceCases / ChangeLog / history tables if they don't exist."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Cable (
+            NAME TEXT,
+            CABLE_STATUS TEXT,
+            FIBRES INTEGER,
+            OWNER TEXT,
+            SPAN_LENGTH REAL,
+            IOF TEXT,
+            PROTECTED TEXT,
+            LINK1 TEXT,
+            LINK2 TEXT,
+            EO TEXT,
+            ID TEXT,
+            SEGMENT_ID TEXT,
+            BUILD_DATE TEXT,
+            CONSTRUCT_TYPE TEXT,
+            geometry BLOB,
+            generated_id TEXT UNIQUE,
+            NAME_KEY TEXT,
+            IS_FSS INTEGER,
+            IS_IOF INTEGER,
+            IS_DECOMMISSIONING INTEGER,
+            IS_FOREIGN_OWNED INTEGER,
+            MIN_LON REAL,
+            MIN_LAT REAL,
+            MAX_LON REAL,
+            MAX_LAT REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS SpliceCases (
+            NAME TEXT,
+            ADDRESS TEXT,
+            SUBURB TEXT,
+            BUTTSPLICE TEXT,
+            RESTRICTED TEXT,
+            RS_CODE TEXT,
+            RS_COMMENTS TEXT,
+            MODEL TEXT,
+            MANHOLE TEXT,
+            OWNER TEXT,
+            VMR_LINK TEXT,
+            EO TEXT,
+            BUILDDATE TEXT,
+            JOBNUMBER TEXT,
+            ID TEXT,
+            geometry BLOB,
+            generated_id TEXT UNIQUE,
+            NAME_KEY TEXT,
+            JOINT_TYPE TEXT,
+            IS_BUTT_SPLICE INTEGER,
+            IS_RESTRICTED INTEGER,
+            IN_SUBSTATION INTEGER,
+            IN_CITIPOWER INTEGER,
+            IN_ETSA INTEGER,
+            IN_TUNNEL INTEGER,
+            MIN_LON REAL,
+            MIN_LAT REAL,
+            MAX_LON REAL,
+            MAX_LAT REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ChangeLog (
+            refreshed_at TEXT,
+            table_name TEXT,
+            generated_id TEXT,
+            NAME TEXT,
+            change TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_changelog_refreshed ON ChangeLog(refreshed_at)")
+    create_history_tables(cursor)
+
+def create_classification_indexes(cursor):
+    """
+    Partial index per flag (keyed by EO, so "restricted splice cases in EO X"
+    is an index range), plus the Fibre Check name lookups covering the flags.
+    """
+    for table, flag_columns in (('Cable', CABLE_FLAG_COLUMNS), ('SpliceCases', SPLICECASE_FLAG_COLUMNS)):
+        for col in flag_columns:
+            if col == 'JOINT_TYPE':
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{table.lower()}_joint_type ON {table}(JOINT_TYPE, EO)")
+            else:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table.lower()}_{col.lower()} ON {table}(EO) WHERE {col} = 1"
+                )
+    cursor.execute("DROP INDEX IF EXISTS ix_cable_name_key")
+    cursor.execute('''
+        CREATE INDEX ix_cable_name_key
+        ON Cable(NAME_KEY, NAME, CABLE_STATUS, OWNER, IOF, CONSTRUCT_TYPE, SEGMENT_ID,
+                 IS_FSS, IS_IOF, IS_DECOMMISSIONING, IS_FOREIGN_OWNED)
+    ''')
+    cursor.execute("DROP INDEX IF EXISTS ix_splicecases_name_key")
+    cursor.execute('''
+        CREATE INDEX ix_splicecases_name_key
+        ON SpliceCases(NAME_KEY, NAME, BUTTSPLICE, RESTRICTED, RS_CODE, RS_COMMENTS, MANHOLE,
+                       JOINT_TYPE, IS_BUTT_SPLICE, IS_RESTRICTED, IN_SUBSTATION, IN_CITIPOWER, IN_ETSA, IN_TUNNEL)
+    ''')
+
+def name_key(name):
+    """Normalized lookup key for Cable / SpliceCases names (stored as NAME_KEY)."""
+    if name is None:
+        return None
+    return str(name).strip().upper()
+
+def has_network_tables(db_path):
+    """True when `db_path` is an existing database with Cable or SpliceCases."""
+    if not os.path.exists(db_path):
+        return False
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            cur = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('Cable', 'SpliceCases')"
+            )
+            return cur.fetchone()[0] > 0
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+def _batched(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def _create_staging(cursor, table, row_columns):
+    """(Re)create the temp staging table _bulk_upsert merges from; returns its name."""
+    col_list = ", ".join(row_columns)
+    staging = f"staging_{table}"
+    # Same declared types as the target, so comparisons see the same affinity
+    cursor.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    cursor.execute(f"CREATE TEMP TABLE {staging} AS SELECT {col_list} FROM main.{table} WHERE 0")
+    cursor.execute(f"CREATE UNIQUE INDEX temp.ux_{staging} ON {staging}(generated_id)")
+    return staging
+
+def _bulk_upsert(cursor, table, row_columns, tracked, rows, batch_size=UPSERT_BATCH_SIZE, refreshed_at=None,
+                 derived=(), staged=None):
+    """
+    Stage `rows` (tuples matching `row_columns`) into a temp
+    table with chunked executemany, then merge them into `table` with one
+    INSERT ... ON CONFLICT(generated_id) DO UPDATE. `derived` columns are
+    rewritten along with the `tracked` ones but don't count as a change.
+    When `staged` (the input row count) is given, the staging table was
+    already filled by stage_sharded_features() and `rows` is ignored.
+
+    With `refreshed_at` set (delta refresh of the live database), rows missing
+    from the input are deleted and every new / updated / removed
+    generated_id is written to ChangeLog under that timestamp.
+    Returns {'new', 'updated', 'unchanged', 'removed'} counted with set-based queries.
+    """
+    all_columns = list(row_columns)
+    col_list = ", ".join(all_columns)
+    staging = f"staging_{table}"
+
+    if staged is None:
+        _create_staging(cursor, table, all_columns)
+        insert_sql = (
+            f"INSERT OR REPLACE INTO temp.{staging} ({col_list}) "
+            f"VALUES ({', '.join('?' * len(all_columns))})"
+        )
+        staged = 0
+        for batch in _batched(rows, batch_size):
+            cursor.executemany(insert_sql, batch)
+            staged += len(batch)
+
+    differs = " OR ".join(f"t.{c} IS NOT s.{c}" for c in tracked)
+    diffs = {
+        'new': ('s', f'''
+            FROM temp.{staging} s
+            WHERE NOT EXISTS (SELECT 1 FROM main.{table} t WHERE t.generated_id = s.generated_id)
+        '''),
+        'updated': ('s', f'''
+            FROM temp.{staging} s
+            JOIN main.{table} t ON t.generated_id = s.generated_id
+            WHERE {differs}
+        '''),
+    }
+    if refreshed_at is not None:
+        diffs['removed'] = ('t', f'''
+            FROM main.{table} t
+            WHERE NOT EXISTS (SELECT 1 FROM temp.{staging} s WHERE s.generated_id = t.generated_id)
+        ''')
+
+    changes = {'new': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+    for kind, (alias, from_sql) in diffs.items():
+        if refreshed_at is None:
+            cursor.execute(f"SELECT COUNT(*) {from_sql}")
+            changes[kind] = cursor.fetchone()[0]
+        else:
+            cursor.execute(f'''
+                INSERT INTO main.ChangeLog (refreshed_at, table_name, generated_id, NAME, change)
+                SELECT ?, ?, {alias}.generated_id, {alias}.NAME, ? {from_sql}
+            ''', (refreshed_at, table, kind))
+            changes[kind] = cursor.rowcount
+
+    assignments = ", ".join(f"{c} = excluded.{c}" for c in tuple(tracked) + tuple(derived))
+    changed = " OR ".join(f"{table}.{c} IS NOT excluded.{c}" for c in tracked)
+    cursor.execute(f'''
+        INSERT INTO main.{table} ({col_list})
+        SELECT {col_list} FROM temp.{staging} WHERE true
+        ON CONFLICT(generated_id) DO UPDATE SET {assignments}
+        WHERE {changed}
+    ''')
+    # Deleted after the insert, so new rows never reuse a removed row's rowid
+    # (the R*Tree and name-search indexes are synced by rowid)
+    if changes['removed']:
+        cursor.execute(f'''
+            DELETE FROM main.{table}
+            WHERE generated_id NOT IN (SELECT generated_id FROM temp.{staging})
+        ''')
+    cursor.execute(f"DROP TABLE temp.{staging}")
+
+    # Duplicate features in the input collapse onto one staged row; the
+    # repeats count as unchanged, as they did with the per-row path.
+    changes['unchanged'] = staged - changes['new'] - changes['updated']
+    return changes
+
+def _prune_change_log(cursor, now, days=CHANGE_LOG_RETENTION_DAYS):
+    cutoff = (now - timedelta(days=days)).isoformat(timespec='seconds')
+    cursor.execute("DELETE FROM ChangeLog WHERE refreshed_at < ?", (cutoff,))
+
+########################################################################
+# GEOMETRY ENCODING
+########################################################################
+
+# Geometry is stored as little-endian 2D WKB with its bounding box in
+# MIN_LON / MIN_LAT / MAX_LON / MAX_LAT. Types WKB has no code for here
+# (GeometryCollection) and databases not yet migrated keep GeoJSON text;
+# decode_geometry() reads both.
+
+_WKB_TYPES = {
+    'Point': 1, 'LineString': 2, 'Polygon': 3,
+    'MultiPoint': 4, 'MultiLineString': 5, 'MultiPolygon': 6,
+}
+_WKB_NAMES = {code: name for name, code in _WKB_TYPES.items()}
+_WKB_PARTS = {'MultiPoint': 'Point', 'MultiLineString': 'LineString', 'MultiPolygon': 'Polygon'}
+
+def _wkb_points(points, acc):
+    flat = [float(v) for pt in points for v in pt[:2]]
+    acc.append(flat)
+    return struct.pack(f'<I{len(flat)}d', len(points), *flat)
+
+def _wkb_body(gtype, coords, acc):
+    head = struct.pack('<BI', 1, _WKB_TYPES[gtype])
+    if gtype == 'Point':
+        xy = [float(coords[0]), float(coords[1])]
+        acc.append(xy)
+        return head + struct.pack('<2d', *xy)
+    if gtype == 'LineString':
+        return head + _wkb_points(coords, acc)
+    if gtype == 'Polygon':
+        return head + struct.pack('<I', len(coords)) + b''.join(_wkb_points(r, acc) for r in coords)
+    part = _WKB_PARTS[gtype]
+    return head + struct.pack('<I', len(coords)) + b''.join(_wkb_body(part, c, acc) for c in coords)
+
+def encode_geometry(geometry):
+    """
+    (wkb, bbox) for a GeoJSON geometry. bbox is (min_lon, min_lat, max_lon, max_lat),
+    or None for null / empty / unsupported geometry (wkb is then b'').
+    Coordinates are packed as doubles, so 150 and 150.0 encode identically.
+    """
+    if not geometry or geometry.get('type') not in _WKB_TYPES:
+        return b'', None
+    acc = []
+    wkb = _wkb_body(geometry['type'], geometry.get('coordinates') or [], acc)
+    xs = [x for flat in acc for x in flat[0::2]]
+    if not xs:
+        return wkb, None
+    ys = [y for flat in acc for y in flat[1::2]]
+    return wkb, (min(xs), min(ys), max(xs), max(ys))
+
+def geometry_to_wkb(geometry):
+    """Little-endian 2D WKB for a GeoJSON geometry; b'' for null or unsupported."""
+    return encode_geometry(geometry)[0]
+
+def _geometry_column_value(geometry, wkb):
+    # what goes into the geometry column for a feature
+    if wkb:
+        return wkb
+    return json.dumps(geometry) if geometry else None
+
+def _wkb_read_points(blob, offset, fmt):
+    n, = struct.unpack_from(fmt + 'I', blob, offset)
+    flat = struct.unpack_from(f'{fmt}{2 * n}d', blob, offset + 4)
+    return [list(flat[i:i + 2]) for i in range(0, 2 * n, 2)], offset + 4 + 16 * n
+
+def _wkb_read(blob, offset):
+    fmt = '<' if blob[offset] == 1 else '>'
+    code, = struct.unpack_from(fmt + 'I', blob, offset + 1)
+    offset += 5
+    gtype = _WKB_NAMES[code]
+    if gtype == 'Point':
+        return gtype, list(struct.unpack_from(fmt + '2d', blob, offset)), offset + 16
+    if gtype == 'LineString':
+        points, offset = _wkb_read_points(blob, offset, fmt)
+        return gtype, points, offset
+    if gtype == 'Polygon':
+        count, = struct.unpack_from(fmt + 'I', blob, offset)
+        offset += 4
+        rings = []
+        for _ in range(count):
+            ring, offset = _wkb_read_points(blob, offset, fmt)
+            rings.append(ring)
+        return gtype, rings, offset
+    count, = struct.unpack_from(fmt + 'I', blob, offset)
+    offset += 4
+    parts = []
+    for _ in range(count):
+        _, coords, offset = _wkb_read(blob, offset)
+        parts.append(coords)
+    return gtype, parts, offset
+
+def decode_geometry(value):
+    """
+    GeoJSON-style geometry dict from a geometry column value: WKB bytes are
+    unpacked directly (no JSON involved), legacy GeoJSON text is json-decoded.
+    """
+    if value is None or value == b'' or value == '':
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    gtype, coords, _ = _wkb_read(bytes(value), 0)
+    return {'type': gtype, 'coordinates': coords}
+
+def geometry_coordinates(value):
+    """Coordinates of a stored geometry (nested lists, GeoJSON layout) or None."""
+    geometry = decode_geometry(value)
+    return geometry.get('coordinates') if geometry else None
+
+def geometry_vertices(value):
+    """Flat list of (lon, lat) tuples for every vertex of a stored geometry."""
+    geometry = decode_geometry(value)
+    if not geometry:
+        return []
+    out = []
+
+    def walk(coords):
+        if coords and isinstance(coords[0], (int, float)):
+            out.append((coords[0], coords[1]))
+        else:
+            for c in coords or []:
+                walk(c)
+
+    walk(geometry.get('coordinates'))
+    return out
+
+########################################################################
+# FEATURE CLASSIFICATION
+########################################################################
+
+# Naming / property rules used by Fibre Check, evaluated once per feature at
+# ingest and stored as flag columns (0/1) so checks and network-wide queries
+# read them instead of re-testing strings per row.
+
+IOF_NAME_TAGS = ("_AP", "_MA", "_SB", "_SM")
+JOINT_TYPES = ("AJL", "BJL", "FJL")
+
+def is_fss_cable_name(name):
+    return bool(name and "FSS" in name.upper())
+
+def is_bjl_splice_case(name):
+    return bool(name and "BJL" in name.upper())
+
+def name_marks_iof(name):
+    """Treat any cable name containing _AP, _MA, _SB, _SM as IOF by naming rule."""
+    if not name:
+        return False
+    up = name.upper()
+    return any(tag in up for tag in IOF_NAME_TAGS)
+
+def splice_joint_type(name):
+    """'AJL' / 'BJL' / 'FJL' (first match in that order) for a splice-case name, else None."""
+    name = name or ""
+    for joint in JOINT_TYPES:
+        if joint in name:
+            return joint
+    return None
+
+def _upper(value):
+    return str(value).strip().upper() if value is not None else ""
+
+def cable_flags(properties):
+    """Values for CABLE_FLAG_COLUMNS."""
+    name = properties.get('NAME') or ""
+    status = properties.get('CABLE_STATUS')
+    return (
+        int(is_fss_cable_name(name)),
+        int(_upper(properties.get('IOF')) == "Y" or name_marks_iof(name)),
+        int("ZLS" in name.upper() or status == "PD"),
+        int(_upper(properties.get('OWNER')) != "OPTUS"),
+    )
+
+def splicecase_flags(properties):
+    """Values for SPLICECASE_FLAG_COLUMNS."""
+    comments = (properties.get('RS_COMMENTS') or "").lower()
+    manhole = (properties.get('MANHOLE') or "").upper()
+    return (
+        splice_joint_type(properties.get('NAME')),
+        int(_upper(properties.get('BUTTSPLICE')) == "Y"),
+        int(_upper(properties.get('RESTRICTED')) == "Y"),
+        int("substation" in comments),
+        int("citipower" in comments or "CP_" in manhole),
+        int("etsa" in comments or "ET_" in manhole),
+        int("tunnel" in comments),
+    )
+
+########################################################################
+# FEATURE HASHING
+########################################################################
+
+# Properties that identify a feature; the tracked columns above are excluded
+CABLE_HASH_COLUMNS = (
+    'NAME', 'OWNER', 'SPAN_LENGTH', 'IOF', 'LINK1', 'LINK2',
+    'EO', 'SEGMENT_ID', 'BUILD_DATE', 'CONSTRUCT_TYPE',
+)
+SPLICECASE_HASH_COLUMNS = (
+    'NAME', 'ADDRESS', 'SUBURB', 'BUTTSPLICE', 'MODEL',
+    'MANHOLE', 'OWNER', 'EO', 'BUILDDATE', 'JOBNUMBER',
+)
+# REAL columns come back from SQLite as floats whatever the GeoJSON held
+_HASH_REAL_COLUMNS = {'SPAN_LENGTH'}
+
+PARALLEL_HASH_MIN_FEATURES = 20000
+PARALLEL_HASH_CHUNK = 2000
+
+def _canonical_value(column, value):
+    if value is None:
+        return None
+    if column in _HASH_REAL_COLUMNS:
+        try:
+            return repr(float(value))
+        except (TypeError, ValueError):
+            return str(value)
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+def _feature_hash(hash_columns, properties, wkb):
+    # Compact, order-fixed property list + WKB coordinates; the same values
+    # read back from database.db produce the same ID.
+    props = [_canonical_value(c, properties.get(c)) for c in hash_columns]
+    data = json.dumps(props, separators=(',', ':')).encode() + b'\x00' + wkb
+    return hashlib.md5(data).hexdigest()
+
+def generate_cable_hash(properties, geometry):
+    return _feature_hash(CABLE_HASH_COLUMNS, properties, geometry_to_wkb(geometry))
+
+def generate_splicecase_hash(properties, geometry):
+    return _feature_hash(SPLICECASE_HASH_COLUMNS, properties, geometry_to_wkb(geometry))
+
+_ROW_SPECS = {
+    'cable': (CABLE_COLUMNS, CABLE_HASH_COLUMNS, cable_flags),
+    'splicecases': (SPLICECASE_COLUMNS, SPLICECASE_HASH_COLUMNS, splicecase_flags),
+}
+
+def _prepare_rows(kind, features):
+    """Turn features into upsert rows laid out as CABLE_/SPLICECASE_ROW_COLUMNS."""
+    columns, hash_columns, flags = _ROW_SPECS[kind]
+    rows = []
+    for feature in features:
+        properties = feature['properties']
+        geometry = feature['geometry']
+        wkb, bbox = encode_geometry(geometry)
+        rows.append(
+            tuple(properties.get(c) for c in columns)
+            + (name_key(properties.get('NAME')),)
+            + flags(properties)
+            + (bbox or (None, None, None, None))
+            + (_geometry_column_value(geometry, wkb), _feature_hash(hash_columns, properties, wkb))
+        )
+    return rows
+
+def _default_hash_workers():
+    return max(1, min(8, (os.cpu_count() or 1) - 1))
+
+def prepare_feature_rows(kind, features, workers=None, chunk_size=PARALLEL_HASH_CHUNK):
+    """
+    Yield upsert rows for `features`, in input order.
+
+    Small inputs are hashed inline. Once more than PARALLEL_HASH_MIN_FEATURES
+    features have been seen, chunks are fanned out to a process pool with a
+    bounded number in flight, so memory stays bounded for streamed input.
+    """
+    workers = _default_hash_workers() if workers is None else workers
+    chunks = _batched(features, chunk_size)
+
+    head = []
+    for chunk in chunks:
+        head.append(chunk)
+        if len(head) * chunk_size >= PARALLEL_HASH_MIN_FEATURES:
+            break
+    else:
+        workers = 1
+    if workers <= 1:
+        for chunk in itertools.chain(head, chunks):
+            yield from _prepare_rows(kind, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in itertools.chain(head, chunks):
+            pending.append(pool.submit(_prepare_rows, kind, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+########################################################################
+# SHARDED INGEST
+########################################################################
+
+# Large GeoJSON files can be split into byte-range shards, each starting at
+# a feature object, and parsed / hashed in a process pool. Every worker
+# writes its rows to its own scratch SQLite file; the parent ATTACHes the
+# shards in file order and copies them into the staging table with one
+# INSERT ... SELECT each, then the usual _bulk_upsert merge runs.
+
+SHARDED_INGEST_MIN_BYTES = 64 << 20
+SHARD_MIN_BYTES = 4 << 20
+SHARD_MAX_BYTES = 64 << 20
+SHARDS_PER_WORKER = 4
+
+_FEATURE_START_RE = re.compile(rb'\{\s*"type"\s*:\s*"Feature"\s*[,}]')
+_SHARD_SCAN_WINDOW = 1 << 16
+
+def _find_feature_start(f, offset, size):
+    """Byte offset of the first feature object at or after `offset`, or None."""
+    while offset < size:
+        f.seek(offset)
+        buf = f.read(_SHARD_SCAN_WINDOW + 256)  # overlap so a match can't straddle windows
+        match = _FEATURE_START_RE.search(buf)
+        if match and (match.start() < _SHARD_SCAN_WINDOW or len(buf) <= _SHARD_SCAN_WINDOW):
+            return offset + match.start()
+        offset += _SHARD_SCAN_WINDOW
+    return None
+
+def plan_feature_shards(path, workers):
+    """
+    [(start, end)] byte ranges covering the features array of a
+    FeatureCollection; every range but the first begins at a feature
+    object. Features whose "type" isn't their first key are never used as
+    a boundary, they just stay inside their neighbour's shard.
+    """
+    size = os.path.getsize(path)
+    shard_bytes = size // max(1, workers * SHARDS_PER_WORKER)
+    shard_bytes = max(SHARD_MIN_BYTES, min(SHARD_MAX_BYTES, shard_bytes))
+    with open(path, 'rb') as f:
+        first = _find_feature_start(f, 0, size)
+        if first is None:
+            return [(0, size)]
+        bounds = [first]
+        while bounds[-1] + shard_bytes < size:
+            start = _find_feature_start(f, bounds[-1] + shard_bytes, size)
+            if start is None:
+                break
+            bounds.append(start)
+    # the first shard keeps the FeatureCollection header, the last its trailer
+    bounds[0] = 0
+    return list(zip(bounds, bounds[1:] + [size]))
+
+def _iter_shard_features(text, first, last):
+    """
+    Features in one shard's text: a comma-separated run of objects, ending
+    at the end of the text or at the "]" closing the features array. The
+    first shard also holds the FeatureCollection header, so it goes through
+    the regular reader with the array closed off at the shard's end.
+    """
+    if first:
+        if not last:
+            text = text.rstrip().rstrip(",") + "]}"
+        yield from _iter_geojson_features_from_chunks([text])
+        return
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        pos = _JSON_WS_RE.match(text, pos).end()
+        if pos >= len(text) or text[pos] == "]":
+            return
+        feature, pos = decoder.raw_decode(text, pos)
+        yield feature
+        pos = _JSON_WS_RE.match(text, pos).end()
+        if pos < len(text) and text[pos] == ",":
+            pos += 1
+
+def _ingest_shard(kind, path, start, end, encoding, row_columns, shard_path):
+    """Process-pool worker: parse + hash one byte range into `shard_path`.rows."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = data.decode(encoding)
+    del data
+    features = _iter_shard_features(text, start == 0, end >= os.path.getsize(path))
+    conn = sqlite3.connect(shard_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(f"CREATE TABLE rows ({', '.join(row_columns)})")
+        insert_sql = f"INSERT INTO rows VALUES ({', '.join('?' * len(row_columns))})"
+        count = 0
+        for batch in _batched(features, PARALLEL_HASH_CHUNK):
+            rows = _prepare_rows(kind, batch)
+            conn.executemany(insert_sql, rows)
+            count += len(rows)
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+def _attach_shard(conn, table, row_columns, shard_path):
+    # DETACH is refused inside a transaction, so each copy commits first
+    col_list = ", ".join(row_columns)
+    conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+    try:
+        conn.execute(f"INSERT OR REPLACE INTO temp.staging_{table} ({col_list}) SELECT {col_list} FROM shard.rows")
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE shard")
+
+def stage_sharded_features(conn, kind, table, row_columns, path, encoding, workdir, workers=None, tracker=None):
+    """
+    Parse and hash the GeoJSON file at `path` in a process pool and fill
+    `table`'s staging table from the worker shards. Must run outside a
+    transaction; returns the staged row count for _bulk_upsert(staged=...).
+    Shards are merged in file order, so duplicate features resolve the same
+    way as the streaming path, and merging overlaps with parsing.
+    """
+    workers = _default_hash_workers() if workers is None else workers
+    shards = plan_feature_shards(path, workers)
+    _create_staging(conn.cursor(), table, row_columns)
+    staged = 0
+    pool = ProcessPoolExecutor(max_workers=max(1, min(workers, len(shards))))
+    try:
+        futures = []
+        for i, (start, end) in enumerate(shards):
+            shard_path = os.path.join(workdir, f"{kind}_{i:04d}.db")
+            futures.append((pool.submit(
+                _ingest_shard, kind, path, start, end, encoding, tuple(row_columns), shard_path
+            ), shard_path, end - start))
+        for future, shard_path, nbytes in futures:
+            while True:
+                try:
+                    count = future.result(timeout=INGEST_POLL_MS / 1000)
+                    break
+                except FutureTimeout:
+                    if tracker:
+                        tracker.check_cancel()
+            _attach_shard(conn, table, row_columns, shard_path)
+            os.remove(shard_path)
+            staged += count
+            if tracker:
+                tracker.features += count
+                tracker.on_read(nbytes)
+                tracker.post()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return staged
+
+def use_sharded_ingest(source, sharded=None, workers=None):
+    """
+    Whether `source` should go through stage_sharded_features(): it must be a
+    file; `sharded` forces the choice, otherwise large files on multi-core
+    machines are sharded.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        return False
+    if sharded is not None:
+        return sharded
+    workers = _default_hash_workers() if workers is None else workers
+    return workers > 1 and os.path.getsize(source) >= SHARDED_INGEST_MIN_BYTES
+
+########################################################################
+# SPATIAL INDEX
+########################################################################
+
+# One R*Tree per table, keyed by the table's rowid and built from the
+# bounding-box columns. The R*Tree only narrows the search to candidate
+# boxes; distances are then measured against the decoded geometry.
+SPATIAL_INDEXES = {'Cable': 'CableIndex', 'SpliceCases': 'SpliceCaseIndex'}
+
+EARTH_RADIUS_M = 6371008.8
+_METRES_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+NEAREST_START_RADIUS_M = 250.0
+NEAREST_MAX_RADIUS_M = 500000.0
+
+def create_spatial_indexes(cursor):
+    """Create the R*Tree tables; False when this SQLite build has no rtree module."""
+    try:
+        for index in SPATIAL_INDEXES.values():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} "
+                f"USING rtree(id, min_lon, max_lon, min_lat, max_lat)"
+            )
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+def _has_table(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+    return cursor.fetchone() is not None
+
+def sync_spatial_index(cursor, table):
+    """
+    Bring `table`'s R*Tree in line with its rows. Existing rows never change
+    geometry (it is part of generated_id), so only deleted and inserted
+    rowids need touching. Returns False when the index doesn't exist.
+    """
+    index = SPATIAL_INDEXES[table]
+    if not _has_table(cursor, index):
+        return False
+    cursor.execute(f"DELETE FROM {index} WHERE id NOT IN (SELECT rowid FROM {table})")
+    cursor.execute(f'''
+        INSERT INTO {index} (id, min_lon, max_lon, min_lat, max_lat)
+        SELECT rowid, MIN_LON, MAX_LON, MIN_LAT, MAX_LAT FROM {table}
+        WHERE MIN_LON IS NOT NULL AND rowid NOT IN (SELECT id FROM {index})
+    ''')
+    return True
+
+def _candidate_sql(cursor, table, columns):
+    # R*Tree join when the index exists, bbox-column scan otherwise
+    col_list = ", ".join(['t.rowid', 't.geometry'] + [f't.{c}' for c in columns])
+    index = SPATIAL_INDEXES[table]
+    if _has_table(cursor, index):
+        return (
+            f"SELECT {col_list} FROM {index} r JOIN {table} t ON t.rowid = r.id "
+            f"WHERE r.max_lon >= ? AND r.min_lon <= ? AND r.max_lat >= ? AND r.min_lat <= ?"
+        )
+    return (
+        f"SELECT {col_list} FROM {table} t "
+        f"WHERE t.MAX_LON >= ? AND t.MIN_LON <= ? AND t.MAX_LAT >= ? AND t.MIN_LAT <= ?"
+    )
+
+def query_bbox(cursor, table, min_lon, min_lat, max_lon, max_lat, columns=('NAME',)):
+    """
+    Rows of `table` whose bounding box intersects the given box, as
+    (rowid, *columns) tuples.
+    """
+    cursor.execute(_candidate_sql(cursor, table, columns), (min_lon, max_lon, min_lat, max_lat))
+    return [(row[0],) + tuple(row[2:]) for row in cursor.fetchall()]
+
+def _segment_distance(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def geometry_distance_m(value, lon, lat):
+    """
+    Approximate distance in metres from (lon, lat) to a stored geometry
+    (nearest vertex or segment). Uses an equirectangular projection around
+    the query point, which is well within a metre at cable-network scales.
+    Polygons are treated as their rings. None for an empty geometry.
+    """
+    geometry = decode_geometry(value)
+    if not geometry:
+        return None
+    kx = _METRES_PER_DEGREE * math.cos(math.radians(lat))
+    ky = _METRES_PER_DEGREE
+    best = None
+
+    def project(pt):
+        return (pt[0] - lon) * kx, (pt[1] - lat) * ky
+
+    def walk(coords):
+        nonlocal best
+        if not coords:
+            return
+        if isinstance(coords[0], (int, float)):
+            d = math.hypot(*project(coords))
+            best = d if best is None else min(best, d)
+            return
+        if isinstance(coords[0][0], (int, float)):
+            pts = [project(pt) for pt in coords]
+            if len(pts) == 1:
+                d = math.hypot(*pts[0])
+            else:
+                d = min(_segment_distance(0.0, 0.0, *a, *b) for a, b in zip(pts, pts[1:]))
+            best = d if best is None else min(best, d)
+            return
+        for c in coords:
+            walk(c)
+
+    walk(geometry.get('coordinates'))
+    return best
+
+def _degree_box(lon, lat, metres):
+    dlat = metres / _METRES_PER_DEGREE
+    dlon = metres / (_METRES_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return lon - dlon, lat - dlat, lon + dlon, lat + dlat
+
+def query_within_distance(cursor, table, lon, lat, metres, columns=('NAME',)):
+    """
+    Rows of `table` within `metres` of (lon, lat), nearest first, as
+    (distance_m, rowid, *columns) tuples.
+    """
+    min_lon, min_lat, max_lon, max_lat = _degree_box(lon, lat, metres)
+    cursor.execute(_candidate_sql(cursor, table, columns), (min_lon, max_lon, min_lat, max_lat))
+    hits = []
+    for row in cursor.fetchall():
+        d = geometry_distance_m(row[1], lon, lat)
+        if d is not None and d <= metres:
+            hits.append((d, row[0]) + tuple(row[2:]))
+    hits.sort(key=lambda h: (h[0], h[1]))
+    return hits
+
+def query_nearest(cursor, table, lon, lat, k=1, columns=('NAME',),
+                  start_radius=NEAREST_START_RADIUS_M, max_radius=NEAREST_MAX_RADIUS_M):
+    """
+    The `k` rows of `table` nearest to (lon, lat), as (distance_m, rowid,
+    *columns) tuples. The search box doubles until it holds k rows within
+    its radius (or reaches max_radius), so results beyond max_radius are
+    not returned.
+    """
+    radius = start_radius
+    while True:
+        hits = query_within_distance(cursor, table, lon, lat, radius, columns)
+        if len(hits) >= k or radius >= max_radius:
+            return hits[:k]
+        radius = min(radius * 2, max_radius)
+
+########################################################################
+# NAME SEARCH INDEX
+########################################################################
+
+# FTS5 trigram index over Cable.NAME_KEY for substring searches
+# (cable_extract.py). Rows are keyed by Cable's rowid and synced the same way
+# as the R*Trees; NAME is part of generated_id, so a row's key never changes.
+# SQLite builds without FTS5 or the trigram tokenizer (before 3.34) just
+# don't get the table, and searches fall back to scanning NAME_KEY.
+NAME_SEARCH_INDEX = 'CableNameSearch'
+
+def create_name_search_index(cursor):
+    """Create the FTS5 name index; False when this SQLite build can't."""
+    try:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {NAME_SEARCH_INDEX} USING fts5(NAME_KEY, tokenize='trigram')"
+        )
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+def sync_name_search_index(cursor):
+    """Apply Cable's deleted / inserted rowids to the name index; False when it doesn't exist."""
+    if not _has_table(cursor, NAME_SEARCH_INDEX):
+        return False
+    cursor.execute(f"DELETE FROM {NAME_SEARCH_INDEX} WHERE rowid NOT IN (SELECT rowid FROM Cable)")
+    cursor.execute(f'''
+        INSERT INTO {NAME_SEARCH_INDEX} (rowid, NAME_KEY)
+        SELECT rowid, NAME_KEY FROM Cable
+        WHERE NAME_KEY IS NOT NULL AND rowid NOT IN (SELECT rowid FROM {NAME_SEARCH_INDEX})
+    ''')
+    return True
+
+########################################################################
+# SNAPSHOT HISTORY
+########################################################################
+
+# Every refresh closes the versions that changed or disappeared (valid_to)
+# and opens a version for each new / changed row (valid_from), so the state
+# of the network as of any refresh is a plain range query. Versions keep
+# the property columns, not geometry: a geometry edit is a new generated_id.
+HISTORY_TABLES = {'Cable': 'CableHistory', 'SpliceCases': 'SpliceCasesHistory'}
+_HISTORY_SPECS = {
+    'Cable': (CABLE_COLUMNS, CABLE_TRACKED_COLUMNS),
+    'SpliceCases': (SPLICECASE_COLUMNS, SPLICECASE_TRACKED_COLUMNS),
+}
+
+def _history_columns(table):
+    return _HISTORY_SPECS[table][0] + ('NAME_KEY', 'generated_id')
+
+def create_history_tables(cursor):
+    """Versioned copies of Cable / SpliceCases (columns typed like the live tables)."""
+    for table, history in HISTORY_TABLES.items():
+        types = {row[1]: row[2] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        columns = ", ".join(f"{c} {types.get(c, 'TEXT')}" for c in _history_columns(table))
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {history} ({columns}, valid_from TEXT NOT NULL, valid_to TEXT)"
+        )
+        prefix = f"ix_{history.lower()}"
+        # at most one open version per feature
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {prefix}_open ON {history}(generated_id) WHERE valid_to IS NULL"
+        )
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_id ON {history}(generated_id, valid_from)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_from ON {history}(valid_from)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_to ON {history}(valid_to)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_name_key ON {history}(NAME_KEY)")
+
+def sync_history(cursor, table, snapshot_at):
+    """
+    Record `table`'s current rows as the snapshot taken at `snapshot_at`
+    (ISO timestamp). Returns (closed, opened) version counts.
+    """
+    history = HISTORY_TABLES[table]
+    tracked = _HISTORY_SPECS[table][1]
+    columns = ", ".join(_history_columns(table))
+    same = " AND ".join(f"t.{c} IS {history}.{c}" for c in tracked)
+    cursor.execute(f'''
+        UPDATE {history} SET valid_to = ?
+        WHERE valid_to IS NULL AND NOT EXISTS (
+            SELECT 1 FROM {table} t WHERE t.generated_id = {history}.generated_id AND {same}
+        )
+    ''', (snapshot_at,))
+    closed = cursor.rowcount
+    cursor.execute(f'''
+        INSERT INTO {history} ({columns}, valid_from, valid_to)
+        SELECT {columns}, ?, NULL FROM {table} t
+        WHERE t.generated_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM {history} h WHERE h.generated_id = t.generated_id AND h.valid_to IS NULL
+        )
+    ''', (snapshot_at,))
+    return closed, cursor.rowcount
+
+def next_snapshot_at(cursor, now):
+    """
+    ISO timestamp for a new snapshot: `now` to the microsecond, moved just
+    past the latest recorded snapshot if needed. Every snapshot thus gets a
+    distinct, increasing timestamp, even for two refreshes in the same
+    second or after the clock steps back.
+    """
+    latest = ''
+    for history in HISTORY_TABLES.values():
+        row = cursor.execute(f"SELECT MAX(valid_from), MAX(valid_to) FROM {history}").fetchone()
+        latest = max([latest] + [v for v in row if v])
+    snapshot_at = now.isoformat(timespec='microseconds')
+    if latest and snapshot_at <= latest:
+        snapshot_at = (datetime.fromisoformat(latest) + timedelta(microseconds=1)).isoformat(timespec='microseconds')
+    return snapshot_at
+
+def _as_of(value):
+    # datetime/date -> ISO text; a bare date means the end of that day
+    if value is None:
+        return '9999-12-31T23:59:59.999999'
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='microseconds')
+    value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    return value + 'T23:59:59.999999' if len(value) == 10 else value
+
+def list_snapshots(cursor):
+    """Timestamps of every recorded refresh, oldest first."""
+    parts = " UNION ".join(
+        f"SELECT valid_from AS ts FROM {h} UNION SELECT valid_to FROM {h} WHERE valid_to IS NOT NULL"
+        for h in HISTORY_TABLES.values()
+    )
+    cursor.execute(f"SELECT ts FROM ({parts}) ORDER BY ts")
+    return [row[0] for row in cursor.fetchall()]
+
+def diff_snapshots(cursor, table, since, until=None):
+    """
+    What changed in `table` between the snapshots current at `since` and
+    at `until` (None = latest). Dates may be datetimes, dates or ISO text.
+    Returns {'added': [...], 'removed': [...], 'changed': [...]}: added /
+    removed are row dicts; changed entries are {'generated_id', 'NAME',
+    'changes': {column: (before, after)}}.
+
+    Only versions opened or closed inside the window are read (via the
+    valid_from / valid_to indexes), so the cost follows the number of
+    changes rather than the size of the network.
+    """
+    history = HISTORY_TABLES[table]
+    cols = _history_columns(table)
+    tracked = _HISTORY_SPECS[table][1]
+    col_list = ", ".join(cols)
+    since, until = _as_of(since), _as_of(until)
+    # o: versions current at `until` that weren't at `since`; c: the reverse
+    with_sql = (
+        f"WITH o AS (SELECT {col_list} FROM {history} "
+        f"WHERE valid_from > ? AND valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)), "
+        f"c AS (SELECT {col_list} FROM {history} "
+        f"WHERE valid_to > ? AND valid_to <= ? AND valid_from <= ?) "
+    )
+    params = (since, until, until, since, until, since)
+
+    def rows(sql):
+        cursor.execute(with_sql + sql, params)
+        return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+    added = rows(
+        f"SELECT {col_list} FROM o WHERE NOT EXISTS (SELECT 1 FROM c WHERE c.generated_id = o.generated_id) "
+        f"ORDER BY NAME_KEY"
+    )
+    removed = rows(
+        f"SELECT {col_list} FROM c WHERE NOT EXISTS (SELECT 1 FROM o WHERE o.generated_id = c.generated_id) "
+        f"ORDER BY NAME_KEY"
+    )
+    before_after = ", ".join(f"c.{col}, o.{col}" for col in tracked)
+    cursor.execute(
+        with_sql
+        + f"SELECT c.generated_id, o.NAME, {before_after} FROM c JOIN o ON c.generated_id = o.generated_id "
+        + "ORDER BY o.NAME_KEY",
+        params
+    )
+    changed = []
+    for row in cursor.fetchall():
+        pairs = zip(tracked, row[2::2], row[3::2])
+        changed.append({
+            'generated_id': row[0],
+            'NAME': row[1],
+            'changes': {col: (old, new) for col, old, new in pairs if old != new},
+        })
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+def feature_history(cursor, table, name):
+    """Every recorded version of the feature(s) called `name`, oldest first."""
+    history = HISTORY_TABLES[table]
+    cols = _history_columns(table) + ('valid_from', 'valid_to')
+    cursor.execute(
+        f"SELECT {', '.join(cols)} FROM {history} WHERE NAME_KEY = ? ORDER BY valid_from, generated_id",
+        (name_key(name),)
+    )
+    return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+########################################################################
+# COLUMNAR SNAPSHOT EXPORT
+########################################################################
+
+# After an update, the attribute columns of Cable and SpliceCases are also
+# written as .npy files for whole-network analytics (spares, ownership,
+# status by EO) that would otherwise read SQLite a row at a time:
+#
+#   columnar/manifest.json
+#   columnar/<Table>/rowid.npy               int64, joins back to SQLite
+#   columnar/<Table>/<COL>.npy               REAL -> float64 (NaN = NULL),
+#                                            INTEGER -> int64 (COLUMNAR_INT_NULL = NULL),
+#                                            flags -> int8 (-1 = NULL)
+#   columnar/<Table>/<COL>.codes.npy         TEXT -> int32 codes (-1 = NULL)
+#   columnar/<Table>/<COL>.dict.npy          sorted distinct values, UTF-8 bytes
+#   columnar/<Table>/<COL>.offsets.npy       int64 offsets into .dict.npy
+#
+# Rows are in rowid order in every file. A value that doesn't fit its numeric
+# column (text in SPAN_LENGTH, say) is exported as NULL and counted under
+# 'invalid' in the manifest. load_columnar_snapshot() maps the arrays with
+# mmap_mode='r', so scans are zero-copy. Needs NumPy.
+
+COLUMNAR_DIR = 'columnar'
+COLUMNAR_FORMAT_VERSION = 2
+# NULL in an int64 column (the smallest int64, which no count or ID uses)
+COLUMNAR_INT_NULL = -2 ** 63
+COLUMNAR_TABLES = {
+    'Cable': CABLE_COLUMNS + ('NAME_KEY',) + CABLE_FLAG_COLUMNS + BBOX_COLUMNS,
+    'SpliceCases': SPLICECASE_COLUMNS + ('NAME_KEY',) + SPLICECASE_FLAG_COLUMNS + BBOX_COLUMNS,
+}
+_COLUMNAR_INT8_COLUMNS = set(CABLE_FLAG_COLUMNS + SPLICECASE_FLAG_COLUMNS) - {'JOINT_TYPE'}
+
+def _columnar_kind(column, declared_type):
+    if column in _COLUMNAR_INT8_COLUMNS:
+        return 'int8'
+    if declared_type.upper() == 'REAL':
+        return 'float64'
+    if declared_type.upper() == 'INTEGER':
+        return 'int64'
+    return 'dict'
+
+def _to_int(value):
+    # SQLite keeps text (and non-integral reals) it can't coerce to INTEGER as-is
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(value)
+    return int(value)
+
+# kind -> (dtype, NULL value, converter, lower bound, upper bound)
+_COLUMNAR_NUMERIC_KINDS = {
+    'float64': ('float64', float('nan'), float, None, None),
+    'int64': ('int64', COLUMNAR_INT_NULL, _to_int, COLUMNAR_INT_NULL + 1, 2 ** 63 - 1),
+    'int8': ('int8', -1, _to_int, -128, 127),
+}
+
+def _numeric_values(values, convert, null, low, high, invalid):
+    """`values` converted for a numeric column; NULLs and bad values become `null` (the latter counted in invalid[0])."""
+    for v in values:
+        if v is None:
+            yield null
+            continue
+        try:
+            number = convert(v)
+        except (TypeError, ValueError, OverflowError):
+            number = None
+        if number is None or (low is not None and not low <= number <= high):
+            invalid[0] += 1
+            yield null
+        else:
+            yield number
+
+def _export_column(cursor, table, column, kind, rows, out_dir):
+    cursor.execute(f"SELECT {column} FROM {table} ORDER BY rowid")
+    values = (r[0] for r in cursor)
+    base = os.path.join(out_dir, column)
+    if kind in _COLUMNAR_NUMERIC_KINDS:
+        dtype, null, convert, low, high = _COLUMNAR_NUMERIC_KINDS[kind]
+        invalid = [0]
+        array = np.fromiter(_numeric_values(values, convert, null, low, high, invalid), dtype=dtype, count=rows)
+        np.save(base + '.npy', array)
+        return {'kind': kind, 'invalid': invalid[0]}
+
+    # dictionary-encode: codes in first-seen order, then remapped to the sorted dictionary
+    seen = {}
+    codes = np.fromiter(
+        (-1 if v is None else seen.setdefault(str(v), len(seen)) for v in values), dtype=np.int32, count=rows
+    )
+    dictionary = sorted(seen)
+    remap = np.empty(len(seen) + 1, dtype=np.int32)
+    remap[-1] = -1  # codes of -1 index the last slot
+    for new, value in enumerate(dictionary):
+        remap[seen[value]] = new
+    codes = remap[codes]
+    encoded = [v.encode('utf-8') for v in dictionary]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(base + '.codes.npy', codes)
+    np.save(base + '.dict.npy', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    np.save(base + '.offsets.npy', offsets)
+    return {'kind': 'dict', 'distinct': len(dictionary)}
+
+def export_columnar_snapshot(db_path, out_dir):
+    """
+    Write the COLUMNAR_TABLES columns of `db_path` under `out_dir` (replaced
+    as a whole once the new export is complete). Returns the manifest.
+    Raises RuntimeError without NumPy.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is not installed; the columnar export needs it.")
+    work_dir = out_dir + '.tmp'
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+    identity = _db_file_identity(db_path)
+    manifest = {
+        'format': COLUMNAR_FORMAT_VERSION,
+        'database': os.path.abspath(db_path),
+        'db_size': identity[1],
+        'db_mtime_ns': identity[2],
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'tables': {},
+    }
+    conn = sqlite3.connect(Path(os.path.abspath(db_path)).as_uri() + "?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+        for table, columns in COLUMNAR_TABLES.items():
+            declared = {r[1]: r[2] for r in cursor.execute(f"PRAGMA table_info({table})")}
+            if not declared:
+                continue
+            table_dir = os.path.join(work_dir, table)
+            os.makedirs(table_dir)
+            rows = cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            cursor.execute(f"SELECT rowid FROM {table} ORDER BY rowid")
+            np.save(os.path.join(table_dir, 'rowid.npy'),
+                    np.fromiter((r[0] for r in cursor), dtype=np.int64, count=rows))
+            manifest['tables'][table] = {
+                'rows': rows,
+                'columns': {
+                    col: _export_column(cursor, table, col, _columnar_kind(col, declared[col]), rows, table_dir)
+                    for col in columns if col in declared
+                },
+            }
+    finally:
+        conn.close()
+    with open(os.path.join(work_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(work_dir, out_dir)
+    return manifest
+
+class DictionaryColumn:
+    """
+    A dictionary-encoded string column: `codes` (int32, -1 = NULL) index a
+    sorted dictionary kept as UTF-8 bytes + offsets. Filter on codes, e.g.
+    col.codes == col.code_of('PA'), and decode only what you show.
+    """
+
+    def __init__(self, codes, data, offsets):
+        self.codes = codes
+        self.data = data
+        self.offsets = offsets
+        self._values = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def value(self, code):
+        if code < 0:
+            return None
+        return bytes(self.data[self.offsets[code]:self.offsets[code + 1]]).decode('utf-8')
+
+    @property
+    def dictionary(self):
+        """All distinct values, in code order (decoded once)."""
+        if self._values is None:
+            self._values = [self.value(i) for i in range(len(self.offsets) - 1)]
+        return self._values
+
+    def code_of(self, value):
+        """Code of `value` (-1, the NULL code, for None; -2, which no row has, when absent)."""
+        if value is None:
+            return -1
+        values = self.dictionary
+        i = bisect.bisect_left(values, value)
+        return i if i < len(values) and values[i] == value else -2
+
+    def decode(self, index):
+        """Value of row `index`."""
+        return self.value(int(self.codes[index]))
+
+def load_columnar_snapshot(out_dir, mmap_mode='r'):
+    """
+    {table: {column: ndarray | DictionaryColumn}} for an export, with every
+    array memory-mapped (mmap_mode=None loads them instead). The manifest is
+    under the '__manifest__' key.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is not installed; the columnar snapshot needs it.")
+    with open(os.path.join(out_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    snapshot = {'__manifest__': manifest}
+    for table, info in manifest['tables'].items():
+        base = os.path.join(out_dir, table)
+        columns = {'rowid': np.load(os.path.join(base, 'rowid.npy'), mmap_mode=mmap_mode)}
+        for col, spec in info['columns'].items():
+            path = os.path.join(base, col)
+            if spec['kind'] == 'dict':
+                columns[col] = DictionaryColumn(
+                    np.load(path + '.codes.npy', mmap_mode=mmap_mode),
+                    np.load(path + '.dict.npy', mmap_mode=mmap_mode),
+                    np.load(path + '.offsets.npy', mmap_mode=mmap_mode),
+                )
+            else:
+                columns[col] = np.load(path + '.npy', mmap_mode=mmap_mode)
+        snapshot[table] = columns
+    return snapshot
+
+########################################################################
+# SCHEMA MIGRATIONS
+########################################################################
+
+def _rehash_table(cursor, table, kind, batch_size=UPSERT_BATCH_SIZE):
+    columns = _ROW_SPECS[kind][0]
+    hash_fn = generate_cable_hash if kind == 'cable' else generate_splicecase_hash
+    col_list = ", ".join(columns)
+    last_rowid = 0
+    while True:
+        cursor.execute(
+            f"SELECT rowid, {col_list}, geometry FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_size)
+        )
+        batch = cursor.fetchall()
+        if not batch:
+            return
+        updates = []
+        for row in batch:
+            properties = dict(zip(columns, row[1:-1]))
+            updates.append((hash_fn(properties, decode_geometry(row[-1])), row[0]))
+        # OR REPLACE: rows that only differed by the old encoding collapse into one
+        cursor.executemany(f"UPDATE OR REPLACE {table} SET generated_id = ? WHERE rowid = ?", updates)
+        last_rowid = batch[-1][0]
+
+def _migrate_hash_v2(cursor):
+    """generated_id switched to the canonical compact encoding."""
+    _rehash_table(cursor, 'Cable', 'cable')
+    _rehash_table(cursor, 'SpliceCases', 'splicecases')
+
+def _table_columns(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+def _migrate_name_keys(cursor):
+    """NAME_KEY lookup column + covering indexes for the Fibre Check reads."""
+    for table in ('Cable', 'SpliceCases'):
+        if 'NAME_KEY' not in _table_columns(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN NAME_KEY TEXT")
+        cursor.execute(f"UPDATE {table} SET NAME_KEY = name_key(NAME)")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS ix_cable_name_key
+        ON Cable(NAME_KEY, NAME, CABLE_STATUS, OWNER, IOF, CONSTRUCT_TYPE, SEGMENT_ID)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS ix_splicecases_name_key
+        ON SpliceCases(NAME_KEY, NAME, BUTTSPLICE, RESTRICTED, RS_CODE, RS_COMMENTS, MANHOLE)
+    ''')
+
+def _migrate_wkb_geometry(cursor, batch_size=UPSERT_BATCH_SIZE):
+    """GeoJSON text geometry -> WKB blobs + bounding-box columns."""
+    for table in ('Cable', 'SpliceCases'):
+        existing = _table_columns(cursor, table)
+        for col in BBOX_COLUMNS:
+            if col not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} REAL")
+        last_rowid = 0
+        while True:
+            cursor.execute(
+                f"SELECT rowid, geometry FROM {table} "
+                f"WHERE rowid > ? AND typeof(geometry) = 'text' ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            )
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            updates = []
+            for rowid, text in batch:
+                geometry = json.loads(text) if text else None
+                wkb, bbox = encode_geometry(geometry)
+                updates.append(
+                    (_geometry_column_value(geometry, wkb),) + (bbox or (None,) * 4) + (rowid,)
+                )
+            cursor.executemany(
+                f"UPDATE {table} SET geometry = ?, MIN_LON = ?, MIN_LAT = ?, MAX_LON = ?, MAX_LAT = ? "
+                f"WHERE rowid = ?",
+                updates
+            )
+            last_rowid = batch[-1][0]
+    # the text pages are only given back to the filesystem by a VACUUM
+    return 'vacuum'
+
+def _migrate_classification_flags(cursor, batch_size=UPSERT_BATCH_SIZE):
+    """Classification flag columns, their partial indexes and flag-covering name indexes."""
+    specs = (
+        ('Cable', 'cable', CABLE_FLAG_COLUMNS),
+        ('SpliceCases', 'splicecases', SPLICECASE_FLAG_COLUMNS),
+    )
+    for table, kind, flag_columns in specs:
+        columns, _, flags = _ROW_SPECS[kind]
+        existing = _table_columns(cursor, table)
+        for col in flag_columns:
+            if col not in existing:
+                col_type = 'TEXT' if col == 'JOINT_TYPE' else 'INTEGER'
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}")
+        col_list = ", ".join(columns)
+        assignments = ", ".join(f"{c} = ?" for c in flag_columns)
+        last_rowid = 0
+        while True:
+            cursor.execute(
+                f"SELECT rowid, {col_list} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            )
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            cursor.executemany(
+                f"UPDATE {table} SET {assignments} WHERE rowid = ?",
+                [flags(dict(zip(columns, row[1:]))) + (row[0],) for row in batch]
+            )
+            last_rowid = batch[-1][0]
+    create_classification_indexes(cursor)
+
+def _migrate_name_search_index(cursor):
+    """
+    FTS5 trigram index over cable names (skipped without FTS5 / trigram), and
+    an index for cable_extract's LINK1 / LINK2 joins on SpliceCases.ID.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_splicecases_id ON SpliceCases(ID)")
+    if create_name_search_index(cursor):
+        sync_name_search_index(cursor)
+
+def _migrate_spatial_index(cursor):
+    """R*Tree over the bounding-box columns (skipped without the rtree module)."""
+    if create_spatial_indexes(cursor):
+        for table in SPATIAL_INDEXES:
+            sync_spatial_index(cursor, table)
+
+# (version, step) pairs; PRAGMA user_version records the last step applied.
+# Any change to the hash definition needs a new step that re-runs _rehash_table.
+_SCHEMA_MIGRATIONS = (
+    (1, _migrate_hash_v2),
+    (2, _migrate_name_keys),
+    (3, _migrate_wkb_geometry),
+    (4, _migrate_spatial_index),
+    (5, _migrate_classification_flags),
+    (6, _migrate_name_search_index),
+)
+DB_SCHEMA_VERSION = _SCHEMA_MIGRATIONS[-1][0]
+
+def migrate_network_database(conn):
+    """Bring an existing database.db up to DB_SCHEMA_VERSION (one transaction per step)."""
+    conn.create_function('name_key', 1, name_key, deterministic=True)
+    cursor = conn.cursor()
+    create_network_tables(cursor)
+    conn.commit()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    vacuum = False
+    for target, step in _SCHEMA_MIGRATIONS:
+        if version >= target:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # a step returns 'vacuum' when it frees a lot of pages
+            vacuum = (step(cursor) == 'vacuum') or vacuum
+            cursor.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+    if vacuum:
+        conn.execute("VACUUM")
+    return version
 
-    def get_html(self, seg_id):
-        """
-        Robust read:
-        1) Try index.json mapping
-        2) Fallback to '<cache_dir>/<SEGMENT_ID>.html'
-        """
-        # 1) via index.json
-        meta = self._index.get(seg_id)
-        if meta:
-            p = meta.get("path", "")
-            if p and os.path.exists(p):
-                try:
-                    with open(p, "r", encoding="utf-8") as f:
-                        return f.read()
-                except Exception:
-                    pass
+########################################################################
+# READ-ONLY DATABASE ACCESS
+########################################################################
 
-        # 2) direct fallback (handles cases where index wasn't flushed but .html exists)
-        p2 = self._path_for(seg_id)
-        if os.path.exists(p2):
-            try:
-                with open(p2, "r", encoding="utf-8") as f:
-                    return f.read()
-            except Exception:
-                return None
-        return None
+# Fibre Check reads database.db once or twice per trace row. Each database
+# file gets one shared read-only connection (mode=ro, memory-mapped, page
+# cache sized to the file) whose statement cache is reused across rows and
+# runs. The Update tab releases it before writing or swapping the file.
 
-    def headers_for(self, seg_id):
-        meta = self._index.get(seg_id, {})
-        headers = meta.get("headers", [])
-        if headers:
-            return headers
-        # Recompute from HTML if needed
-        html = self.get_html(seg_id)
-        if not html:
-            return []
-        headers, rows = parse_gridview2(html)
-        meta["headers"] = headers or []
-        meta["rows_len"] = len(rows or [])
-        self._index[seg_id] = meta
-        self._save_index()
-        return headers or []
+READER_CACHED_STATEMENTS = 256
+READER_MAX_CACHE_BYTES = 256 << 20
+READER_MAX_MMAP_BYTES = 1 << 30
 
-    def rows_for(self, seg_id):
-        """
-        Return the parsed rows for a cached seg_id, recomputing from HTML if necessary.
-        """
-        html = self.get_html(seg_id)
-        if not html:
-            return []
-        headers, rows = parse_gridview2(html)
-        # update cache metadata
-        meta = self._index.get(seg_id, {})
-        meta["headers"] = headers or meta.get("headers", [])
-        meta["rows_len"] = len(rows or [])
-        self._index[seg_id] = meta
-        self._save_index()
-        return rows or []
+def _db_file_identity(db_path):
+    # changes when the file is replaced (swap) or rewritten in place (delta refresh)
+    st = os.stat(db_path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
 
-    def set_tray_alert(self, seg_id, tray_str, flag):
-        meta = self._index.get(seg_id)
-        if meta is not None:
-            meta.setdefault("has_alert_by_tray", {})[tray_str] = bool(flag)
-            self._save_index()
+class OutdatedDatabaseError(Exception):
+    """database.db predates DB_SCHEMA_VERSION; only the Update tab migrates it."""
 
-    def tray_has_alert(self, seg_id, tray_str):
-        meta = self._index.get(seg_id)
-        if not meta:
-            return False
-        return bool(meta.get("has_alert_by_tray", {}).get(tray_str, False))
+class NetworkDatabaseReader:
+    """
+    Lazily opened read-only connection to a network database, reopened
+    whenever the file at `db_path` is replaced or modified. Reads run inside
+    reading(); close() and paused() wait for them to finish, so the Update
+    worker can release the file while Fibre Check is mid-lookup. The reader
+    never writes: a database older than DB_SCHEMA_VERSION raises
+    OutdatedDatabaseError.
+    """
 
-########################################################################
-# REUSABLE DOWNLOAD LOGIC
-########################################################################
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        self._conn = None
+        self._identity = None
+        self._users = 0
+        self._cond = threading.Condition(threading.RLock())
+
+    def _file_identity(self):
+        return _db_file_identity(self.db_path)
+
+    def _open(self):
+        # caller holds the lock; a connection in use is kept even if the file
+        # has since changed (it is reopened by the next read after that)
+        identity = self._file_identity()
+        if self._conn is not None and (identity == self._identity or self._users):
+            return self._conn
+        self._close()
+        conn = sqlite3.connect(
+            Path(self.db_path).as_uri() + "?mode=ro", uri=True,
+            cached_statements=READER_CACHED_STATEMENTS, check_same_thread=False
+        )
+        try:
+            has_cable = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='Cable'"
+            ).fetchone()[0]
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if has_cable and version < DB_SCHEMA_VERSION:
+                raise OutdatedDatabaseError(
+                    f"{self.db_path} has schema version {version}; this version of the tool needs {DB_SCHEMA_VERSION}"
+                )
+            size = identity[1]
+            conn.execute(f"PRAGMA mmap_size = {min(size, READER_MAX_MMAP_BYTES)}")
+            # negative cache_size is in KiB
+            conn.execute(f"PRAGMA cache_size = -{max(2048, min(size, READER_MAX_CACHE_BYTES) // 1024)}")
+        except BaseException:
+            conn.close()
+            raise
+        self._conn = conn
+        self._identity = identity
+        return conn
 
-def download_file(
-    url, 
-    destination, 
-    proxies, 
-    retry_count=0, 
-    on_success=None, 
-    on_progress=None,
-    on_error=None
-):
+    @contextmanager
+    def reading(self):
+        """
+        The shared connection for the duration of the with block; raises
+        FileNotFoundError when the database is missing.
+        """
+        with self._cond:
+            conn = self._open()
+            self._users += 1
+        try:
+            yield conn
+        finally:
+            with self._cond:
+                self._users -= 1
+                self._cond.notify_all()
+
+    def has_table(self, name):
+        with self.reading() as conn:
+            cur = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name = ?", (name,))
+            return cur.fetchone()[0] > 0
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+        self._identity = None
+
+    def close(self):
+        """Close the connection once current reads are done (it reopens on next use)."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._users)
+            self._close()
+
+    @contextmanager
+    def paused(self):
+        """Closed, with new reads held back, for the duration of the with block."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._users)
+            self._close()
+            yield
+
+_network_readers = {}
+_network_readers_lock = threading.Lock()
+
+def _reader_key(db_path):
+    return os.path.normcase(os.path.abspath(db_path))
+
+def network_reader(db_path):
+    """The shared NetworkDatabaseReader for `db_path`."""
+    with _network_readers_lock:
+        key = _reader_key(db_path)
+        reader = _network_readers.get(key)
+        if reader is None:
+            reader = _network_readers[key] = NetworkDatabaseReader(db_path)
+        return reader
+
+def release_network_reader(db_path):
     """
-    Download a file with progress reporting and error handling.
+    Close the shared read connection to `db_path` once in-flight reads are
+    done (it reopens on next use).
+    """
+    with _network_readers_lock:
+        reader = _network_readers.get(_reader_key(db_path))
+    if reader is not None:
+        reader.close()
+
+# Columns Fibre Check reads for each cable / splice case in a trace
+CHECK_CABLE_COLUMNS = ('NAME', 'CABLE_STATUS', 'OWNER', 'IOF', 'CONSTRUCT_TYPE', 'SEGMENT_ID') + CABLE_FLAG_COLUMNS
+CHECK_SPLICECASE_COLUMNS = (
+    ('NAME', 'BUTTSPLICE', 'RESTRICTED', 'RS_CODE', 'RS_COMMENTS', 'MANHOLE') + SPLICECASE_FLAG_COLUMNS
+)
+
+def cable_check_record(row):
+    """Fibre Check dict for a Cable row selected as CHECK_CABLE_COLUMNS."""
+    data = {'NAME': row[0]}
+    data.update((col, v if v else "") for col, v in zip(CHECK_CABLE_COLUMNS[1:6], row[1:6]))
+    data.update((col, bool(v)) for col, v in zip(CABLE_FLAG_COLUMNS, row[6:]))
+    return data
+
+def splicecase_check_record(row):
+    """Fibre Check dict for a SpliceCases row selected as CHECK_SPLICECASE_COLUMNS."""
+    data = {'NAME': row[0]}
+    data.update((col, v if v else "") for col, v in zip(CHECK_SPLICECASE_COLUMNS[1:6], row[1:6]))
+    data['JOINT_TYPE'] = row[6]
+    data.update((col, bool(v)) for col, v in zip(SPLICECASE_FLAG_COLUMNS[1:], row[7:]))
+    return data
+
+def resolve_check_records(cursor, cable_names=(), splice_names=()):
     """
+    Look up every distinct cable / splice-case name of a trace at once:
+    the NAME_KEYs go into a temp table that is joined against Cable and
+    SpliceCases (one query each). Returns {'cables': {...}, 'splicecases': {...}}
+    keyed by name_key(); names missing from the database have no entry.
+    """
+    records = {'cables': {}, 'splicecases': {}}
+    conn = cursor.connection
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS check_keys (kind TEXT, key TEXT, PRIMARY KEY (kind, key))")
     try:
-        response = requests.get(url, stream=True, proxies=proxies, timeout=10)
-        if response.status_code == 200:
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
-            with open(destination, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        file.write(chunk)
-                        downloaded_size += len(chunk)
-                        if total_size > 0 and on_progress:
-                            progress_pct = (downloaded_size / total_size) * 100
-                            on_progress(destination, progress_pct)
-            if on_success:
-                on_success(destination)
+        cursor.execute("DELETE FROM temp.check_keys")
+        cursor.executemany(
+            "INSERT OR IGNORE INTO temp.check_keys VALUES (?, ?)",
+            [('cables', name_key(n)) for n in cable_names if n]
+            + [('splicecases', name_key(n)) for n in splice_names if n]
+        )
+        for kind, table, columns, record in (
+            ('cables', 'Cable', CHECK_CABLE_COLUMNS, cable_check_record),
+            ('splicecases', 'SpliceCases', CHECK_SPLICECASE_COLUMNS, splicecase_check_record),
+        ):
+            cursor.execute(f'''
+                SELECT k.key, {", ".join("t." + c for c in columns)}
+                FROM temp.check_keys k JOIN main.{table} t ON t.NAME_KEY = k.key
+                WHERE k.kind = ?
+                ORDER BY t.NAME_KEY, t.rowid
+            ''', (kind,))
+            found = records[kind]
+            for row in cursor.fetchall():
+                # names can repeat (generated_id covers more than the name): the
+                # lowest rowid per key wins, as in the single-row lookups
+                if row[0] not in found:
+                    found[row[0]] = record(row[1:])
+    finally:
+        # don't leave the shared read connection inside a transaction
+        conn.commit()
+    return records
+
+class NetworkCatalogue:
+    """
+    In-process copy of the Fibre Check attributes of every cable and
+    splice case, so a Process click resolves a trace without touching
+    SQLite. Rows are kept as tuples in CHECK_*_COLUMNS order, keyed by
+    NAME_KEY, with repeated values (status, owner, model...) shared.
+    refresh() reloads whenever database.db's identity (inode, size,
+    mtime) changes, e.g. after the Update tab swaps a new file in.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        self.cables = {}
+        self.splicecases = {}
+        self.identity = None
+        self.load_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reload if the database file changed; True when it was (re)loaded."""
+        with self._lock:
+            identity = _db_file_identity(self.db_path)
+            if identity == self.identity:
+                return False
+            started = time.perf_counter()
+            shared = {}
+            with network_reader(self.db_path).reading() as conn:
+                cursor = conn.cursor()
+                self.cables = self._load(cursor, 'Cable', CHECK_CABLE_COLUMNS, shared)
+                self.splicecases = self._load(cursor, 'SpliceCases', CHECK_SPLICECASE_COLUMNS, shared)
+            self.identity = identity
+            self.load_seconds = time.perf_counter() - started
             return True
-        else:
-            error_msg = (
-                f"Failed to download {destination}. "
-                f"HTTP status code: {response.status_code}"
-            )
-            if on_error:
-                on_error(error_msg)
-    except Exception as e:
-        if on_error:
-            on_error(f"Error downloading {destination}: {e}")
-    return False
+
+    @staticmethod
+    def _load(cursor, table, columns, shared):
+        # the lowest rowid per key wins, the same tie-break as the SQL lookups
+        # (SQLite still scans the covering name index, sorting only within a key)
+        cursor.execute(f"SELECT NAME_KEY, {', '.join(columns)} FROM {table} ORDER BY NAME_KEY, rowid")
+        records = {}
+        for row in cursor:
+            if row[0] is None or row[0] in records:
+                continue
+            records[row[0]] = tuple(shared.setdefault(v, v) for v in row[1:])
+        return records
+
+    def resolve(self, cable_names=(), splice_names=()):
+        """Same result as resolve_check_records(), from memory."""
+        out = {'cables': {}, 'splicecases': {}}
+        for names, records, found, record in (
+            (cable_names, self.cables, out['cables'], cable_check_record),
+            (splice_names, self.splicecases, out['splicecases'], splicecase_check_record),
+        ):
+            for name in names:
+                key = name_key(name) if name else None
+                row = records.get(key)
+                if row is not None:
+                    found[key] = record(row)
+        return out
+
+    def memory_bytes(self):
+        """Approximate size of the loaded catalogue (dicts, keys, tuples, shared values)."""
+        total = 0
+        seen = set()
+        for records in (self.cables, self.splicecases):
+            total += sys.getsizeof(records)
+            for key, row in records.items():
+                total += sys.getsizeof(key) + sys.getsizeof(row)
+                for v in row:
+                    if id(v) not in seen:
+                        seen.add(id(v))
+                        total += sys.getsizeof(v)
+        return total
+
+    def describe(self):
+        return (
+            f"Network catalogue loaded: {len(self.cables):,} cables, {len(self.splicecases):,} splice cases, "
+            f"~{self.memory_bytes() / (1024 * 1024):.1f} MB in {self.load_seconds:.2f}s"
+        )
+
+_network_catalogues = {}
+
+def network_catalogue(db_path):
+    """The shared NetworkCatalogue for `db_path` (call refresh() before use)."""
+    with _network_readers_lock:
+        key = _reader_key(db_path)
+        catalogue = _network_catalogues.get(key)
+        if catalogue is None:
+            catalogue = _network_catalogues[key] = NetworkCatalogue(db_path)
+        return catalogue
 
 ########################################################################
 # Fibre Database Update Tool
 ########################################################################
 
 class FibreDatabaseUpdater:
+    PROXIES = {
+        'http': 'http://extranetproxy1.optus.com.au:8080',
+        'https': 'http://extranetproxy1.optus.com.au:8080',
+    }
+    CABLE_URL = "https://athena-ipne.optusnet.com.au/ipne_data/ce/optus_fiber.geojson"
+    SPLICE_URL = "https://athena-ipne.optusnet.com.au/ipne_data/ce/SpliceCases.geojson"
+    # write the .npy snapshot (see export_columnar_snapshot) after each update
+    EXPORT_COLUMNAR = True
+
     def __init__(self, parent):
         """
         Create the 'Fibre Database Update Tool' UI inside `parent`.
@@ -533,6 +3050,12 @@ class FibreDatabaseUpdater:
         # For download progress display
         self.download_progress_var = StringVar(value="")
 
+        # Background ingest (Run Update / Download & Update)
+        self.ingest_progress_var = StringVar(value="")
+        self._ingest_thread = None
+        self._ingest_events = None
+        self._ingest_cancel = None
+
         self.build_ui()
         self.update_file_status_labels()
 
@@ -608,12 +3131,31 @@ class FibreDatabaseUpdater:
         progress_label.pack()
 
         # Run Update button
-        run_button = ttk.Button(
+        self.run_button = ttk.Button(
             self.parent,
             text="Run Update",
             command=self.on_run_update
         )
-        run_button.pack(pady=20)
+        self.run_button.pack(pady=(20, 5))
+
+        # Download and ingest in one pass
+        self.pipeline_button = ttk.Button(
+            self.parent,
+            text="Download & Update",
+            command=self.on_download_and_update
+        )
+        self.pipeline_button.pack(pady=5)
+
+        # Ingest progress + cancel
+        ingest_label = ttk.Label(self.parent, textvariable=self.ingest_progress_var, foreground="green")
+        ingest_label.pack()
+        self.cancel_button = ttk.Button(
+            self.parent,
+            text="Cancel Update",
+            command=self.on_cancel_update,
+            state=tk.DISABLED
+        )
+        self.cancel_button.pack(pady=5)
 
         credit_label = ttk.Label(self.parent, text="developed by Jian", foreground="gray", font=("Arial", 10))
         credit_label.pack(side="bottom", pady=5)
@@ -670,51 +3212,126 @@ class FibreDatabaseUpdater:
 
         threading.Thread(target=self.perform_downloads).start()
 
-    def perform_downloads(self):
-        proxies = {
-            'http': 'http://extranetproxy1.optus.com.au:8080',
-            'https': 'http://extranetproxy1.optus.com.au:8080',
-        }
-
-        cable_url = "https://athena-ipne.optusnet.com.au/ipne_data/ce/optus_fiber.geojson"
-        splice_url = "https://athena-ipne.optusnet.com.au/ipne_data/ce/SpliceCases.geojson"
+    def _download_progress_reporter(self, destinations, label="Downloading"):
+        """on_progress callback showing overall and per-file % in download_progress_var."""
+        progress = {os.path.basename(dest): 0.0 for dest in destinations}
+        progress_lock = threading.Lock()
 
         def on_progress(file_dest, pct):
-            self.parent.after(0, lambda: self.download_progress_var.set(
-                f"Downloading {os.path.basename(file_dest)}: {pct:.2f}%"
-            ))
+            with progress_lock:
+                progress[os.path.basename(file_dest)] = pct
+                overall = sum(progress.values()) / len(progress)
+                parts = " | ".join(f"{name} {p:.1f}%" for name, p in progress.items())
+            msg = f"{label} {overall:.1f}%: {parts}"
+            self.parent.after(0, lambda: self.download_progress_var.set(msg))
+
+        return on_progress
+
+    def perform_downloads(self):
+        proxies = self.PROXIES
+        downloads = [
+            (self.CABLE_URL, os.path.join(self.current_dir, self.cable_filename)),
+            (self.SPLICE_URL, os.path.join(self.current_dir, self.splice_filename)),
+        ]
+        on_progress = self._download_progress_reporter([dest for _, dest in downloads])
+        unchanged = []
 
         def on_success(file_dest):
             pass
 
+        def on_not_modified(file_dest):
+            unchanged.append(os.path.basename(file_dest))
+
         def on_error(msg):
             self.parent.after(0, lambda: messagebox.showerror("Download Error", msg))
 
-        cable_dest = os.path.join(self.current_dir, self.cable_filename)
-        success_cable = download_file(
-            cable_url,
-            cable_dest,
-            proxies,
-            retry_count=0,
-            on_success=on_success,
-            on_progress=on_progress,
-            on_error=on_error
+        # both files at once over one pooled session; each download reports
+        # its own errors, so a failure in one doesn't stop the other
+        session = make_download_session(proxies)
+        try:
+            with ThreadPoolExecutor(max_workers=len(downloads)) as pool:
+                futures = [
+                    pool.submit(
+                        download_file,
+                        url,
+                        dest,
+                        proxies,
+                        retry_count=0,
+                        on_success=on_success,
+                        on_progress=on_progress,
+                        on_error=on_error,
+                        on_not_modified=on_not_modified,
+                        session=session
+                    )
+                    for url, dest in downloads
+                ]
+                results = [f.result() for f in futures]
+        finally:
+            session.close()
+
+        failed = [os.path.basename(dest) for (_, dest), ok in zip(downloads, results) if not ok]
+        done_msg = "Download completed."
+        if failed:
+            done_msg = f"Download finished with errors: {', '.join(failed)} failed."
+        if unchanged:
+            done_msg += f" Already up to date: {', '.join(unchanged)}"
+        self.parent.after(0, self.update_file_status_labels)
+        self.parent.after(0, lambda: self.download_progress_var.set(done_msg))
+
+    def on_download_and_update(self):
+        if self._ingest_running():
+            return
+        response = messagebox.askyesno(
+            "Download & Update",
+            "This will download optus_fiber.geojson and SpliceCases.geojson and update the database "
+            "while they download.\nContinue?"
         )
+        if not response:
+            return
 
-        if success_cable:
-            splice_dest = os.path.join(self.current_dir, self.splice_filename)
-            download_file(
-                splice_url,
-                splice_dest,
-                proxies,
-                retry_count=0,
-                on_success=on_success,
-                on_progress=on_progress,
-                on_error=on_error
-            )
+        self.download_progress_var.set("Starting download & update...")
+        self._start_ingest(self.download_and_ingest)
 
-        self.parent.after(0, self.update_file_status_labels)
-        self.parent.after(0, lambda: self.download_progress_var.set("Download completed."))
+    def download_and_ingest(self, progress=None, cancel=None):
+        """
+        Download both files and ingest them in one pass; returns the ingest()
+        summary. optus_fiber.geojson is parsed and upserted as its bytes
+        arrive (download, parse and SQL run as separate stages joined by
+        bounded queues); SpliceCases.geojson downloads to disk alongside it
+        and is ingested from there once the cable stage is done. Any download
+        failure rolls the update back.
+        """
+        proxies = self.PROXIES
+        cable_dest = os.path.join(self.current_dir, self.cable_filename)
+        splice_dest = os.path.join(self.current_dir, self.splice_filename)
+        on_progress = self._download_progress_reporter([cable_dest, splice_dest], label="Download & update")
+        splice_errors = []
+
+        session = make_download_session(proxies)
+        try:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                splice_future = pool.submit(
+                    download_file,
+                    self.SPLICE_URL,
+                    splice_dest,
+                    proxies,
+                    on_progress=on_progress,
+                    on_error=splice_errors.append,
+                    session=session
+                )
+
+                def splice_features():
+                    if not splice_future.result():
+                        raise DownloadError(splice_errors[-1] if splice_errors else "SpliceCases download failed")
+                    yield from iter_geojson_features(splice_dest, encoding='ISO-8859-1')
+
+                cable_features = prefetch_features(iter_downloaded_features(
+                    self.CABLE_URL, cable_dest, proxies, 'ascii', session=session, on_progress=on_progress
+                ))
+                return self.ingest(cable_features, splice_features(), progress=progress, cancel=cancel)
+        finally:
+            session.close()
+            self.parent.after(0, self.update_file_status_labels)
 
     def on_run_update(self):
         cable_file = os.path.join(self.current_dir, self.cable_filename)
@@ -728,281 +3345,325 @@ class FibreDatabaseUpdater:
             )
             return
 
-        self.run_tool(
-            cable_file if os.path.exists(cable_file) else None,
-            splice_file if os.path.exists(splice_file) else None
+        cable_file = cable_file if os.path.exists(cable_file) else None
+        splice_file = splice_file if os.path.exists(splice_file) else None
+        self._start_ingest(
+            lambda progress, cancel: self.ingest(cable_file, splice_file, progress=progress, cancel=cancel)
         )
 
+    def on_cancel_update(self):
+        if self._ingest_running():
+            self._ingest_cancel.set()
+            self.ingest_progress_var.set("Cancelling...")
+
+    ###########################################
+    # Background ingest worker
+    ###########################################
+    def _ingest_running(self):
+        return self._ingest_thread is not None and self._ingest_thread.is_alive()
+
+    def _set_ingest_controls(self, running):
+        self.run_button.config(state=tk.DISABLED if running else tk.NORMAL)
+        self.pipeline_button.config(state=tk.DISABLED if running else tk.NORMAL)
+        self.cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
+
+    def _start_ingest(self, job):
+        """
+        Run job(progress, cancel) on a worker thread so Tk stays responsive.
+        The worker only talks to the UI through a queue, drained by
+        _poll_ingest() on the Tk thread.
+        """
+        if self._ingest_running():
+            return
+        events = self._ingest_events = queue.Queue()
+        cancel = self._ingest_cancel = threading.Event()
+
+        def worker():
+            try:
+                message = job(lambda event: events.put(('progress', event)), cancel)
+                events.put(('done', message))
+            except IngestCancelled as e:
+                events.put(('cancelled', e.schema_upgraded))
+            except Exception as e:
+                events.put(('error', self._ingest_error_dialog(e)))
+
+        self.ingest_progress_var.set("Starting update...")
+        self._set_ingest_controls(True)
+        self._ingest_thread = threading.Thread(target=worker, daemon=True)
+        self._ingest_thread.start()
+        self.parent.after(INGEST_POLL_MS, self._poll_ingest)
+
+    def _poll_ingest(self):
+        events = self._ingest_events
+        while True:
+            try:
+                kind, payload = events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                if not self._ingest_cancel.is_set():
+                    self.ingest_progress_var.set(format_ingest_progress(payload))
+                continue
+            self._set_ingest_controls(False)
+            self.update_file_status_labels()
+            if kind == 'done':
+                self.ingest_progress_var.set("Update complete.")
+                messagebox.showinfo("Update Complete", payload)
+            elif kind == 'cancelled':
+                if payload:
+                    self.ingest_progress_var.set(
+                        "Update cancelled; the data refresh was rolled back (the database schema upgrade was kept)."
+                    )
+                else:
+                    self.ingest_progress_var.set("Update cancelled; the data refresh was rolled back.")
+            else:
+                self.ingest_progress_var.set("Update failed.")
+                messagebox.showerror(*payload)
+            return
+        self.parent.after(INGEST_POLL_MS, self._poll_ingest)
+
     ###########################################
     # Database update methods and hashing functions
     ###########################################
     def generate_cable_hash(self, properties, geometry):
-        stable_properties = {
-            'NAME': properties.get('NAME'),
-            'OWNER': properties.get('OWNER'),
-            'SPAN_LENGTH': properties.get('SPAN_LENGTH'),
-            'IOF': properties.get('IOF'),
-            'LINK1': properties.get('LINK1'),
-            'LINK2': properties.get('LINK2'),
-            'EO': properties.get('EO'),
-            'SEGMENT_ID': properties.get('SEGMENT_ID'),
-            'BUILD_DATE': properties.get('BUILD_DATE'),
-            'CONSTRUCT_TYPE': properties.get('CONSTRUCT_TYPE'),
-        }
-        data_string = json.dumps(stable_properties, sort_keys=True) + json.dumps(geometry)
-        return hashlib.md5(data_string.encode()).hexdigest()
+        return generate_cable_hash(properties, geometry)
 
     def generate_splicecase_hash(self, properties, geometry):
-        stable_properties = {
-            'NAME': properties.get('NAME'),
-            'ADDRESS': properties.get('ADDRESS'),
-            'SUBURB': properties.get('SUBURB'),
-            'BUTTSPLICE': properties.get('BUTTSPLICE'),
-            'MODEL': properties.get('MODEL'),
-            'MANHOLE': properties.get('MANHOLE'),
-            'OWNER': properties.get('OWNER'),
-            'EO': properties.get('EO'),
-            'BUILDDATE': properties.get('BUILDDATE'),
-            'JOBNUMBER': properties.get('JOBNUMBER'),
-        }
-        data_string = json.dumps(stable_properties, sort_keys=True) + json.dumps(geometry)
-        return hashlib.md5(data_string.encode()).hexdigest()
-
-    def update_cable_data(self, cursor, data):
-        changes = {'new': 0, 'updated': 0, 'unchanged': 0}
-        for feature in data['features']:
-            properties = feature['properties']
-            geometry = feature['geometry']
-            generated_id = self.generate_cable_hash(properties, geometry)
-            cursor.execute('SELECT CABLE_STATUS, FIBRES, PROTECTED FROM Cable WHERE generated_id = ?', (generated_id,))
-            existing_record = cursor.fetchone()
-
-            if existing_record:
-                if (existing_record[0] != properties.get('CABLE_STATUS') or
-                    existing_record[1] != properties.get('FIBRES') or
-                    existing_record[2] != properties.get('PROTECTED')):
-                    cursor.execute('''
-                        UPDATE Cable
-                        SET CABLE_STATUS = ?, FIBRES = ?, PROTECTED = ?
-                        WHERE generated_id = ?
-                    ''', (
-                        properties.get('CABLE_STATUS'),
-                        properties.get('FIBRES'),
-                        properties.get('PROTECTED'),
-                        generated_id
-                    ))
-                    changes['updated'] += 1
-                else:
-                    changes['unchanged'] += 1
-            else:
-                cursor.execute('''
-                    INSERT INTO Cable (
-                        NAME, CABLE_STATUS, FIBRES, OWNER, SPAN_LENGTH,
-                        IOF, PROTECTED, LINK1, LINK2, EO, ID,
-                        SEGMENT_ID, BUILD_DATE, CONSTRUCT_TYPE, geometry, generated_id
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    properties.get('NAME'),
-                    properties.get('CABLE_STATUS'),
-                    properties.get('FIBRES'),
-                    properties.get('OWNER'),
-                    properties.get('SPAN_LENGTH'),
-                    properties.get('IOF'),
-                    properties.get('PROTECTED'),
-                    properties.get('LINK1'),
-                    properties.get('LINK2'),
-                    properties.get('EO'),
-                    properties.get('ID'),
-                    properties.get('SEGMENT_ID'),
-                    properties.get('BUILD_DATE'),
-                    properties.get('CONSTRUCT_TYPE'),
-                    json.dumps(feature.get('geometry')),
-                    generated_id
-                ))
-                changes['new'] += 1
-        return changes
-
-    def update_splicecases_data(self, cursor, data):
-        changes = {'new': 0, 'updated': 0, 'unchanged': 0}
-        for feature in data['features']:
-            properties = feature['properties']
-            geometry = feature['geometry']
-            generated_id = self.generate_splicecase_hash(properties, geometry)
-            cursor.execute('SELECT RESTRICTED, RS_CODE, RS_COMMENTS, VMR_LINK FROM SpliceCases WHERE generated_id = ?', (generated_id,))
-            existing_record = cursor.fetchone()
-
-            if existing_record:
-                if (existing_record[0] != properties.get('RESTRICTED') or
-                    existing_record[1] != properties.get('RS_CODE') or
-                    existing_record[2] != properties.get('RS_COMMENTS') or
-                    existing_record[3] != properties.get('VMR_LINK')):
-                    cursor.execute('''
-                        UPDATE SpliceCases
-                        SET RESTRICTED = ?, RS_CODE = ?, RS_COMMENTS = ?, VMR_LINK = ?
-                        WHERE generated_id = ?
-                    ''', (
-                        properties.get('RESTRICTED'),
-                        properties.get('RS_CODE'),
-                        properties.get('RS_COMMENTS'),
-                        properties.get('VMR_LINK'),
-                        generated_id
-                    ))
-                    changes['updated'] += 1
-                else:
-                    changes['unchanged'] += 1
-            else:
-                cursor.execute('''
-                    INSERT INTO SpliceCases (
-                        NAME, ADDRESS, SUBURB, BUTTSPLICE, RESTRICTED,
-                        RS_CODE, RS_COMMENTS, MODEL, MANHOLE, OWNER,
-                        VMR_LINK, EO, BUILDDATE, JOBNUMBER, ID, geometry, generated_id
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    properties.get('NAME'),
-                    properties.get('ADDRESS'),
-                    properties.get('SUBURB'),
-                    properties.get('BUTTSPLICE'),
-                    properties.get('RESTRICTED'),
-                    properties.get('RS_CODE'),
-                    properties.get('RS_COMMENTS'),
-                    properties.get('MODEL'),
-                    properties.get('MANHOLE'),
-                    properties.get('OWNER'),
-                    properties.get('VMR_LINK'),
-                    properties.get('EO'),
-                    properties.get('BUILDDATE'),
-                    properties.get('JOBNUMBER'),
-                    properties.get('ID'),
-                    json.dumps(feature.get('geometry')),
-                    generated_id
-                ))
-                changes['new'] += 1
-        return changes
+        return generate_splicecase_hash(properties, geometry)
+
+    def update_cable_data(self, cursor, features, refreshed_at=None, staged=None):
+        rows = prepare_feature_rows('cable', features) if staged is None else ()
+        return _bulk_upsert(
+            cursor, 'Cable', CABLE_ROW_COLUMNS, CABLE_TRACKED_COLUMNS, rows, refreshed_at=refreshed_at,
+            derived=CABLE_FLAG_COLUMNS, staged=staged
+        )
+
+    def update_splicecases_data(self, cursor, features, refreshed_at=None, staged=None):
+        rows = prepare_feature_rows('splicecases', features) if staged is None else ()
+        return _bulk_upsert(
+            cursor, 'SpliceCases', SPLICECASE_ROW_COLUMNS, SPLICECASE_TRACKED_COLUMNS, rows, refreshed_at=refreshed_at,
+            derived=SPLICECASE_FLAG_COLUMNS, staged=staged
+        )
 
     def run_tool(self, cable_file, splicecase_file):
-        """Update the SQLite database using the GeoJSON files."""
+        """
+        Update the SQLite database using the GeoJSON files, reporting the
+        outcome in a dialog. See ingest() for how the update is applied.
+        """
+        if not cable_file and not splicecase_file:
+            messagebox.showerror(
+                "No Files Selected",
+                "Please ensure at least one GeoJSON file exists to perform the update."
+            )
+            return
+        try:
+            message = self.ingest(cable_file, splicecase_file)
+        except Exception as e:
+            messagebox.showerror(*self._ingest_error_dialog(e))
+            return
+        messagebox.showinfo("Update Complete", message)
+
+    def _export_columnar(self, tracker):
+        """
+        Refresh the columnar snapshot next to database.db; returns a line for
+        the summary. The update is already committed, so this can't fail it
+        (or be cancelled).
+        """
+        if not self.EXPORT_COLUMNAR or np is None:
+            return ""
+        tracker.phase = 'export'
+        tracker.post()
+        started = time.perf_counter()
+        try:
+            export_columnar_snapshot(self.db_path, os.path.join(self.current_dir, COLUMNAR_DIR))
+        except Exception as e:
+            return f"Columnar export failed: {e}\n"
+        return f"Columnar snapshot exported in {time.perf_counter() - started:.1f}s\n"
+
+    @staticmethod
+    def _ingest_error_dialog(e):
+        """(title, message) for an exception raised by ingest()."""
+        if isinstance(e, FileNotFoundError):
+            return "File Not Found", f"An input file could not be found: {e}"
+        if isinstance(e, json.JSONDecodeError):
+            return "JSON Error", f"Invalid JSON in input file: {e}"
+        if isinstance(e, sqlite3.Error):
+            return "Database Error", f"A database error occurred: {e}"
+        if isinstance(e, DownloadError):
+            return "Download Error", str(e)
+        traceback.print_exc(file=sys.stderr)
+        return "Unexpected Error", f"An unexpected error occurred: {e}"
+
+    def ingest(self, cable_source, splice_source, progress=None, cancel=None, sharded=None):
+        """
+        Apply the cable / splice-case features to the database and return
+        the summary text. Each source is a GeoJSON path or an iterable of
+        features (e.g. a download stream); either may be None.
+        progress(event) receives IngestProgress events; setting the `cancel`
+        Event aborts with IngestCancelled. Large files are parsed in a
+        process pool (see use_sharded_ingest; `sharded` forces it on or off).
+
+        With a live database.db present the refresh is a delta: incoming
+        features are diffed against it by generated_id and only inserts,
+        updates and deletions are applied (one transaction, logged to
+        ChangeLog). Otherwise a fresh database_new.db is built and swapped in.
+        On any error the transaction is rolled back, database_new.db is
+        removed and the exception propagates.
+        """
         conn = None
         # --- Modified: use a temporary new database file ---
         new_db_path = os.path.join(self.current_dir, 'database_new.db')
-        try:
-            if not cable_file and not splicecase_file:
-                messagebox.showerror(
-                    "No Files Selected",
-                    "Please ensure at least one GeoJSON file exists to perform the update."
-                )
-                return
+        delta_mode = has_network_tables(self.db_path)
+        sources = [s for s in (cable_source, splice_source) if s]
+        total_bytes = None
+        if sources and all(isinstance(s, (str, os.PathLike)) for s in sources):
+            total_bytes = sum(os.path.getsize(s) for s in sources if os.path.exists(s))
+        tracker = IngestProgress(progress, cancel, total_bytes)
+        shard_dir = None
+        schema_upgraded = False
+        # Fibre Check's shared read connection must not hold the file open
+        release_network_reader(self.db_path)
 
-            # Connect to the **new** database, not the live one
-            conn = sqlite3.connect(new_db_path)
+        try:
+            tracker.set_phase('prepare')
+            if delta_mode:
+                conn = sqlite3.connect(self.db_path)
+            else:
+                # Connect to the **new** database, not the live one
+                if os.path.exists(new_db_path):
+                    os.remove(new_db_path)
+                conn = sqlite3.connect(new_db_path)
             cursor = conn.cursor()
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            # steps are committed one by one (VACUUM can't run in a transaction)
+            schema_upgraded = migrate_network_database(conn) > version and delta_mode
+            if cancel is not None:
+                # lets Cancel interrupt a long-running merge statement
+                conn.set_progress_handler(cancel.is_set, 10000)
+
+            # Sharded sources are parsed and staged before the write transaction
+            started = time.perf_counter()
+            staged = {}
+            for kind, table, row_columns, source, encoding in (
+                ('cable', 'Cable', CABLE_ROW_COLUMNS, cable_source, 'ascii'),
+                ('splicecases', 'SpliceCases', SPLICECASE_ROW_COLUMNS, splice_source, 'ISO-8859-1'),
+            ):
+                if source and use_sharded_ingest(source, sharded):
+                    if shard_dir is None:
+                        shard_dir = tempfile.mkdtemp(prefix='shards_', dir=self.current_dir)
+                    tracker.set_phase(kind)
+                    staged[kind] = stage_sharded_features(
+                        conn, kind, table, row_columns, source, encoding, shard_dir, tracker=tracker
+                    )
 
-            # Create tables if they don't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS Cable (
-                    NAME TEXT,
-                    CABLE_STATUS TEXT,
-                    FIBRES INTEGER,
-                    OWNER TEXT,
-                    SPAN_LENGTH REAL,
-                    IOF TEXT,
-                    PROTECTED TEXT,
-                    LINK1 TEXT,
-                    LINK2 TEXT,
-                    EO TEXT,
-                    ID TEXT,
-                    SEGMENT_ID TEXT,
-                    BUILD_DATE TEXT,
-                    CONSTRUCT_TYPE TEXT,
-                    geometry TEXT,
-                    generated_id TEXT UNIQUE
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS SpliceCases (
-                    NAME TEXT,
-                    ADDRESS TEXT,
-                    SUBURB TEXT,
-                    BUTTSPLICE TEXT,
-                    RESTRICTED TEXT,
-                    RS_CODE TEXT,
-                    RS_COMMENTS TEXT,
-                    MODEL TEXT,
-                    MANHOLE TEXT,
-                    OWNER TEXT,
-                    VMR_LINK TEXT,
-                    EO TEXT,
-                    BUILDDATE TEXT,
-                    JOBNUMBER TEXT,
-                    ID TEXT,
-                    geometry TEXT,
-                    generated_id TEXT UNIQUE
-                )
-            ''')
-
-            conn.execute('BEGIN')
+            conn.execute('BEGIN IMMEDIATE')
 
             total_changes = {
-                'cable': {'new': 0, 'updated': 0, 'unchanged': 0},
-                'splicecases': {'new': 0, 'updated': 0, 'unchanged': 0}
+                'cable': {'new': 0, 'updated': 0, 'unchanged': 0, 'removed': 0},
+                'splicecases': {'new': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
             }
+            now = datetime.now()
+            refreshed_at = now.isoformat(timespec='seconds') if delta_mode else None
+
+            # Other features are streamed straight from disk (or the network) into SQLite
+            if cable_source:
+                tracker.set_phase('cable')
+                cable_features = None
+                if 'cable' not in staged:
+                    cable_features = tracker.track(open_feature_source(cable_source, 'ascii', tracker.on_read))
+                total_changes['cable'] = self.update_cable_data(
+                    cursor, cable_features, refreshed_at, staged=staged.get('cable')
+                )
 
-            if cable_file:
-                with open(cable_file, 'r', encoding='ascii') as f:
-                    cable_data = json.load(f)
-                total_changes['cable'] = self.update_cable_data(cursor, cable_data)
-
-            if splicecase_file:
-                with open(splicecase_file, 'r', encoding='ISO-8859-1') as f:
-                    splicecases_data = json.load(f)
-                total_changes['splicecases'] = self.update_splicecases_data(cursor, splicecases_data)
+            if splice_source:
+                tracker.set_phase('splicecases')
+                splice_features = None
+                if 'splicecases' not in staged:
+                    splice_features = tracker.track(
+                        open_feature_source(splice_source, 'ISO-8859-1', tracker.on_read)
+                    )
+                total_changes['splicecases'] = self.update_splicecases_data(
+                    cursor, splice_features, refreshed_at, staged=staged.get('splicecases')
+                )
 
+            tracker.set_phase('history')
+            snapshot_at = next_snapshot_at(cursor, now)
+            for table in HISTORY_TABLES:
+                sync_history(cursor, table, snapshot_at)
+
+            tracker.set_phase('index')
+            for table in SPATIAL_INDEXES:
+                sync_spatial_index(cursor, table)
+            sync_name_search_index(cursor)
+            if delta_mode:
+                _prune_change_log(cursor, now)
+            tracker.set_phase('commit')
             conn.commit()
+            elapsed = time.perf_counter() - started
+            feature_count = sum(
+                c['new'] + c['updated'] + c['unchanged'] for c in total_changes.values()
+            )
 
             # Build the summary message
             message = f"Update Complete\n\nDatabase Location:\n{self.db_path}\n\n"
-            if cable_file:
+            if cable_source:
                 message += (
                     f"Cable changes:\n"
                     f"- {total_changes['cable']['new']} new\n"
                     f"- {total_changes['cable']['updated']} updated\n"
-                    f"- {total_changes['cable']['unchanged']} unchanged\n\n"
+                    f"- {total_changes['cable']['unchanged']} unchanged\n"
                 )
-            if splicecase_file:
+                if delta_mode:
+                    message += f"- {total_changes['cable']['removed']} removed\n"
+                message += "\n"
+            if splice_source:
                 message += (
                     f"SpliceCase changes:\n"
                     f"- {total_changes['splicecases']['new']} new\n"
                     f"- {total_changes['splicecases']['updated']} updated\n"
                     f"- {total_changes['splicecases']['unchanged']} unchanged\n"
                 )
+                if delta_mode:
+                    message += f"- {total_changes['splicecases']['removed']} removed\n"
+
+            rate = feature_count / elapsed if elapsed > 0 else 0.0
+            peak_rss = _peak_rss_bytes()
+            message += (
+                f"\nIngested {feature_count} features in {elapsed:.1f}s "
+                f"({rate:,.0f} features/s)"
+            )
+            if peak_rss:
+                message += f", peak RSS {peak_rss / (1024 * 1024):.0f} MB"
+            message += "\n"
 
-            # --- Modified: swap in the new DB on success ---
             conn.close()
-            if os.path.exists(self.db_path):
-                os.remove(self.db_path)
-            os.rename(new_db_path, self.db_path)
-
-            messagebox.showinfo("Update Complete", message)
-
-        except FileNotFoundError as e:
-            messagebox.showerror("File Not Found", f"An input file could not be found: {e}")
-        except json.JSONDecodeError as e:
-            messagebox.showerror("JSON Error", f"Invalid JSON in input file: {e}")
-        except sqlite3.Error as e:
-            # If anything goes wrong with SQLite, roll back and delete the bad temp DB
-            if conn:
-                conn.rollback()
-                conn.close()
-            if os.path.exists(new_db_path):
-                os.remove(new_db_path)
-            messagebox.showerror("Database Error", f"A database error occurred: {e}")
-        except Exception as e:
-            traceback.print_exc(file=sys.stderr)
-            # Clean up temp on unexpected errors
+            if not delta_mode:
+                # --- Modified: swap in the new DB on success ---
+                # (Fibre Check reads wait for the swap instead of reopening the old file)
+                with network_reader(self.db_path).paused():
+                    if os.path.exists(self.db_path):
+                        os.remove(self.db_path)
+                    os.rename(new_db_path, self.db_path)
+
+            message += self._export_columnar(tracker)
+            return message
+
+        except BaseException:
             if conn:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    pass
                 conn.close()
-            if os.path.exists(new_db_path):
+            if not delta_mode and os.path.exists(new_db_path):
                 os.remove(new_db_path)
-            messagebox.showerror("Unexpected Error", f"An unexpected error occurred: {e}")
+            if cancel is not None and cancel.is_set():
+                # the interrupted statement surfaces as sqlite3.OperationalError
+                raise IngestCancelled(schema_upgraded) from None
+            raise
+        finally:
+            if shard_dir is not None:
+                shutil.rmtree(shard_dir, ignore_errors=True)
 
 
 ########################################################################
@@ -1030,6 +3691,8 @@ class FibreProcessor:
 
         # cross-section cache
         self.cs_cache = CrossSectionCache()
+        # concurrent VMR requests during the cross-section crawl
+        self.crawl_per_host = CRAWL_PER_HOST
 
         # progress bar (hidden until used) — use parent_frame, not main_frame
         self.progress_frame = ttk.Frame(self.parent_frame)
@@ -1084,10 +3747,14 @@ class FibreProcessor:
         self.crawl_enabled = tk.BooleanVar(value=True)
         self.crawl_check = ttk.Checkbutton(conn_frame, text="Connect VMR (Crawl Cross-Sections)", variable=self.crawl_enabled)
         self.crawl_check.grid(row=0, column=0, padx=5)
+        # re-fetch every cross section even when a fresh copy is cached
+        self.force_refresh = tk.BooleanVar(value=False)
+        ttk.Checkbutton(conn_frame, text="Force refresh", variable=self.force_refresh)\
+            .grid(row=0, column=1, padx=5)
 
         # Process Button
-        ttk.Button(self.parent_frame, text="Process", command=self.process_data)\
-            .grid(row=4, column=0, columnspan=3, pady=10)
+        self.process_button = ttk.Button(self.parent_frame, text="Process", command=self.process_data)
+        self.process_button.grid(row=4, column=0, columnspan=3, pady=10)
 
         # Results Table
         self.create_treeview(self.parent_frame)
@@ -1214,7 +3881,7 @@ class FibreProcessor:
     # >>> NEW: window close cleanup
     def _on_close(self):
         try:
-            self.cs_cache.clear()
+            self.cs_cache.close()
         except Exception:
             pass
         try:
@@ -1225,6 +3892,7 @@ class FibreProcessor:
     # ---------------------------------------------------------------------
     # Helper: extract cross-section table headers + rows from cached HTML
     # ---------------------------------------------------------------------
+    @staticmethod
     def _extract_cross_section_table(html_text):
         """
         Parse the Cross Section HTML (WorkFolder.aspx or FibreTrace.aspx)
@@ -1328,19 +3996,20 @@ class FibreProcessor:
             messagebox.showwarning("No SEGMENT_ID", "SEGMENT_ID not found for this cable.")
             return
 
-        # Get cached or live HTML + parsed table
+        # Fetch the page unless a fresh copy is cached, then read its stored table
         try:
-            html_text = self.cs_cache.get_html(seg_id)
-            if not html_text:
-                resp = requests.get(VMR_Cable_URL + seg_id, headers={"User-Agent": "FibreAssist/1.0"}, timeout=30, verify=True)
-                resp.raise_for_status()
-                self.cs_cache.put_html(seg_id, resp.text)
-                html_text = resp.text
-
-            headers = self.cs_cache.headers_for(seg_id)
-            rows = self.cs_cache.rows_for(seg_id)
-            if not headers or not rows:
-                headers, rows = self._extract_cross_section_table(html_text)
+            html_text = None
+            if not self.cs_cache.fresh(seg_id):
+                html_text = get_vmr_client().get_html(VMR_Cable_URL + seg_id, timeout=30)
+                self.cs_cache.put_html(seg_id, html_text)
+            # a page the cache could not store is parsed from what was just fetched
+            stored = html_text is None or self.cs_cache.has(seg_id)
+
+            # parsed tables are stored with the page, so reopening never re-parses
+            for parser in (parse_gridview2, self._extract_cross_section_table):
+                headers, rows = self.cs_cache.table_for(seg_id, parser=parser) if stored else parser(html_text)
+                if headers and rows:
+                    break
         except Exception as e:
             messagebox.showerror("Parse Error", str(e))
             return
@@ -1576,8 +4245,8 @@ class FibreProcessor:
             else:
                 tube = "Junction"
         else:
-            a_end_type = "AJL" if "AJL" in a_end else "BJL" if "BJL" in a_end else "FJL" if "FJL" in a_end else None
-            b_end_type = "AJL" if "AJL" in b_end else "BJL" if "BJL" in b_end else "FJL" if "FJL" in b_end else None
+            a_end_type = splice_joint_type(a_end)
+            b_end_type = splice_joint_type(b_end)
 
             if (a_end_type == "BJL" and b_end_type == "BJL") or \
                (a_end_type == "FJL" and b_end_type == "BJL") or \
@@ -1883,21 +4552,18 @@ class FibreProcessor:
     # === ADD inside class FibreProcessor (near your other @staticmethod helpers) ===
     @staticmethod
     def _is_fss_cable(name: str) -> bool:
-        return bool(name and "FSS" in name.upper())
+        return is_fss_cable_name(name)
 
     @staticmethod
     def _is_bjl_splice_case(s: str) -> bool:
-        return bool(s and "BJL" in s.upper())
+        return is_bjl_splice_case(s)
 
     @staticmethod
     def _name_marks_iof(name: str) -> bool:
         """
         Treat any cable name containing _AP, _MA, _SB, _SM as IOF by naming rule.
         """
-        if not name:
-            return False
-        up = name.upper()
-        return any(tag in up for tag in ["_AP", "_MA", "_SB", "_SM"])
+        return name_marks_iof(name)
 
 
     def _extract_js_trace_data(self, html_content):
@@ -2057,7 +4723,7 @@ class FibreProcessor:
 
     def process_data(self):
         # Added 'os' to imports for file cleanup
-        import re, sqlite3, traceback, requests, time, os
+        import re, traceback, time, os
         from tkinter import messagebox
 
         self.log("Starting processing...")
@@ -2066,6 +4732,15 @@ class FibreProcessor:
         # Track temp file for cleanup
         temp_csv_file = None
 
+        def fail(e):
+            traceback.print_exc()
+            self.log(f"CRITICAL ERROR: {e}")
+            messagebox.showerror("Error", f"An error occurred: {e}")
+            # Ensure cleanup happens even on crash if temp file exists
+            if temp_csv_file and os.path.exists(temp_csv_file):
+                try: os.remove(temp_csv_file)
+                except: pass
+
         try:
             # =========================================================
             # 1. LOAD DATA (CSV or VMR)
@@ -2131,12 +4806,12 @@ class FibreProcessor:
                 self.tree.delete(iid)
             self.row_meta = {}
 
-            # Reset cache
+            # The cross-section cache persists between runs; only expired / excess pages go
             try:
-                self.cs_cache.clear()
+                self.cs_cache.prune()
             except Exception as e:
-                self.log(f"Warning clearing cache: {e}")
-            self.cs_cache = CrossSectionCache()
+                self.log(f"Warning pruning cache: {e}")
+            self.cs_cache.reset_stats()
 
             # =========================================================
             # 3. BUILD CRAWL LIST
@@ -2144,7 +4819,6 @@ class FibreProcessor:
             to_crawl = []
             seg_by_row_index = {}
             tray_by_row_index = {}
-            segid_cache = {}
             seg_ids_needed = set()
 
             # Robust column indexing
@@ -2157,6 +4831,8 @@ class FibreProcessor:
 
             name_col = _idx("Fibre Cable", 2)
             tray_col = _idx("Fibre Tray")
+            b_col = _idx("B-End", 3)
+            cd_col = _idx("Connect/Disconnect", 4)
 
             # Helper to derive tray from selected fibre number
             def _derive_tray(row, n_col):
@@ -2171,22 +4847,54 @@ class FibreProcessor:
                 return ""
             
             # --- Check Database Availability BEFORE Loop ---
+            # (read-only: an out-of-date database.db is left for the Update tab to migrate)
             db_available = False
+            reader = None
             if os.path.exists(self.db_path):
                 try:
-                    conn_check = sqlite3.connect(self.db_path)
-                    cur_check = conn_check.cursor()
-                    cur_check.execute("SELECT count(*) FROM sqlite_master WHERE type='table' AND name='Cable'")
-                    if cur_check.fetchone()[0] > 0:
+                    reader = network_reader(self.db_path)
+                    if reader.has_table('Cable'):
                         db_available = True
                     else:
                         self.log("ERROR: Database exists but table 'Cable' is missing.")
-                    conn_check.close()
+                except OutdatedDatabaseError:
+                    self.log("WARNING: database.db was built by an older version. Run 'Fibre Database Update' tab to upgrade it.")
+                    messagebox.showwarning(
+                        "Database Update Needed",
+                        "database.db was built by an older version of this tool.\n"
+                        "Run an update on the 'Fibre Database Update' tab, then process again.\n\n"
+                        "Database checks are skipped for this run."
+                    )
                 except Exception as e:
                     self.log(f"ERROR: Database check failed: {e}")
             else:
                 self.log("WARNING: database.db not found. Run 'Fibre Database Update' tab.")
 
+            # --- Resolve every cable / B-End splice case of the trace in one go ---
+            # (consumed by both the crawl list and the populate pass below; served
+            # from the in-memory catalogue, which reloads when database.db changes)
+            check_records = {'cables': {}, 'splicecases': {}}
+            if db_available:
+                cable_names, splice_names = set(), set()
+                for row in processed_data[1:]:
+                    if name_col is not None and len(row) > name_col:
+                        cable_names.add(row[name_col].split("(")[0].strip())
+                    if (cd_col is not None and len(row) > cd_col and str(row[cd_col]).strip()
+                            and b_col is not None and len(row) > b_col):
+                        splice_names.add(row[b_col].split("@")[0].strip())
+                try:
+                    catalogue = network_catalogue(self.db_path)
+                    if catalogue.refresh():
+                        self.log(catalogue.describe())
+                    check_records = catalogue.resolve(cable_names, splice_names)
+                except Exception as e:
+                    self.log(f"Network catalogue unavailable ({e}); querying the database.")
+                    try:
+                        with reader.reading() as conn:
+                            check_records = resolve_check_records(conn.cursor(), cable_names, splice_names)
+                    except Exception as e:
+                        self.log(f"DB Error resolving cables / splice cases: {e}")
+
             # Build crawl list
             for i in range(1, len(processed_data)):
                 row = processed_data[i]
@@ -2202,23 +4910,11 @@ class FibreProcessor:
                 if not t_str:
                     continue
 
-                # Only try to fetch Segment ID if DB is available
+                # Segment ID comes from the resolved records (empty without a DB)
                 cable_name = row[name_col]
                 key = cable_name.split("(")[0].strip()
-                seg_id = ""
-
-                if key in segid_cache:
-                    seg_id = segid_cache[key]
-                elif db_available:
-                    try:
-                        conn_tmp = sqlite3.connect(self.db_path)
-                        cur = conn_tmp.cursor()
-                        cd = self.fetch_cable_data(cur, key)
-                        conn_tmp.close()
-                        if cd: seg_id = cd.get("SEGMENT_ID", "")
-                    except Exception as e:
-                        self.log(f"DB Error fetching cable {key}: {e}")
-                    segid_cache[key] = seg_id
+                cd = check_records['cables'].get(name_key(key))
+                seg_id = cd.get("SEGMENT_ID", "") if cd else ""
                 
                 if seg_id:
                     seg_by_row_index[i] = seg_id
@@ -2230,221 +4926,218 @@ class FibreProcessor:
             # =========================================================
             # 4. PERFORM CRAWL
             # =========================================================
+            pending_crawl = None
             if self.crawl_enabled.get():
                 if not db_available:
                     self.log("Skipping VMR Cross-Section crawl because Database is missing (cannot map Cable Name -> Segment ID).")
                 elif not to_crawl:
                     self.log("Connect VMR is ON, but no valid Segment IDs found to crawl.")
                 else:
-                    self.log(f"Crawling {len(to_crawl)} cross-sections...")
-                    self.progress["maximum"] = len(to_crawl)
-                    self.progress["value"] = 0
-                    self.progress_frame.grid(row=4, column=0, sticky="w", padx=6, pady=(4, 2))
-                    self.parent_frame.update_idletasks()
-
-                    for idx, (seg_id, url) in enumerate(to_crawl, start=1):
-                        try:
-                            self.log(f"Crawling {idx}/{len(to_crawl)}: {seg_id}")
-                            resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15, verify=True)
-                            if resp.status_code == 200:
-                                headers, rows = self.cs_cache.put_html(seg_id, resp.text)
-                                # Pre-calculate alerts
-                                for r_idx, s_id in seg_by_row_index.items():
-                                    if s_id == seg_id:
-                                        t = tray_by_row_index.get(r_idx, "")
-                                        if t:
-                                            sub = filter_rows_by_tray_range(rows, t)
-                                            flag = rows_have_alert(headers, sub)
-                                            self.cs_cache.set_tray_alert(seg_id, t, flag)
-                            else:
-                                self.log(f"Failed {seg_id}: HTTP {resp.status_code}")
-                        except Exception as e:
-                            self.log(f"Error crawling {seg_id}: {e}")
-                        finally:
-                            self.progress["value"] = idx
-                            self.parent_frame.update_idletasks()
-                    
-                    self.progress_frame.grid_remove()
-                    self.log("Crawl complete.")
+                    # tray ranges whose alerts are pre-calculated as each page arrives
+                    trays_by_seg = {}
+                    for r_idx, s_id in seg_by_row_index.items():
+                        t = tray_by_row_index.get(r_idx, "")
+                        if t:
+                            trays_by_seg.setdefault(s_id, set()).add(t)
+
+                    # pages still fresh in the cache are not fetched again
+                    cached = set()
+                    if not self.force_refresh.get():
+                        cached = {s_id for s_id, _ in to_crawl if self.cs_cache.fresh(s_id)}
+                        for s_id in cached:
+                            self.cs_cache.fill_tray_alerts(s_id, trays_by_seg.get(s_id, ()))
+                        to_crawl = [(s_id, url) for s_id, url in to_crawl if s_id not in cached]
+                    if cached:
+                        self.log(f"{len(cached)} cross-sections served from cache.")
+
+                    if to_crawl:
+                        pending_crawl = (to_crawl, trays_by_seg)
+                    else:
+                        self.log(self.cs_cache.describe())
 
             # =========================================================
             # 5. POPULATE UI
             # =========================================================
-            conn = None
-            cursor = None
-            if db_available:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-
-            # ... [Indices Setup] ...
-            src_a     = _idx("A-End", 1)
-            src_cable = _idx("Fibre Cable", 2)
-            src_b     = _idx("B-End", 3)
-            src_cd    = _idx("Connect/Disconnect", 4)
-            src_eo    = _idx("EO", 5)
-            src_len   = _idx("Length", 6)
-            src_tube  = _idx("Tube", 7)
-            src_tray  = _idx("Fibre Tray")
-
-            cols = self.tree["columns"]
-            try: ui_rs   = cols.index("RS Type")
-            except: ui_rs = None
-            try: ui_iof  = cols.index("IOF")
-            except: ui_iof = None
-            try: ui_dwdm = cols.index("DWDM/T_ found")
-            except: ui_dwdm = None
-            try: ui_comm = cols.index("Commentary")
-            except: ui_comm = len(cols)-1
-
-            self.show_next_tray = False 
 
-            for i in range(1, len(processed_data)):
-                row = processed_data[i]
-                def _v(idx): return row[idx] if idx is not None and idx < len(row) else ""
+            def populate():
+                try:
+                    # ... [Indices Setup] ...
+                    src_a     = _idx("A-End", 1)
+                    src_cable = _idx("Fibre Cable", 2)
+                    src_b     = _idx("B-End", 3)
+                    src_cd    = _idx("Connect/Disconnect", 4)
+                    src_eo    = _idx("EO", 5)
+                    src_len   = _idx("Length", 6)
+                    src_tube  = _idx("Tube", 7)
+                    src_tray  = _idx("Fibre Tray")
+
+                    cols = self.tree["columns"]
+                    try: ui_rs   = cols.index("RS Type")
+                    except: ui_rs = None
+                    try: ui_iof  = cols.index("IOF")
+                    except: ui_iof = None
+                    try: ui_dwdm = cols.index("DWDM/T_ found")
+                    except: ui_dwdm = None
+                    try: ui_comm = cols.index("Commentary")
+                    except: ui_comm = len(cols)-1
+
+                    self.show_next_tray = False 
+
+                    for i in range(1, len(processed_data)):
+                        row = processed_data[i]
+                        def _v(idx): return row[idx] if idx is not None and idx < len(row) else ""
                 
-                val_cable = _v(src_cable)
-                val_cd    = _v(src_cd)
-                val_tray  = _v(src_tray)
-                real_tray = tray_by_row_index.get(i, val_tray)
+                        val_cable = _v(src_cable)
+                        val_cd    = _v(src_cd)
+                        val_tray  = _v(src_tray)
+                        real_tray = tray_by_row_index.get(i, val_tray)
                 
-                allow_tray = bool(val_cd.strip()) or self.show_next_tray
-                display_tray = real_tray if allow_tray else ""
-                self.show_next_tray = bool(val_cd.strip())
-
-                values = [
-                    _v(src_a), val_cable, _v(src_b), val_cd, _v(src_eo), _v(src_len),
-                    _v(src_tube), "", "", "", display_tray, "" 
-                ]
-                item_id = self.tree.insert("", "end", values=values)
-                self.row_meta[item_id] = {"segment_id": seg_by_row_index.get(i, "")}
-
-                tags = []
-                commentary_parts = []
-
-                # --- 1. DWDM/T_ Check ---
-                seg_id = seg_by_row_index.get(i, "")
-                if seg_id and real_tray and self.cs_cache.tray_has_alert(seg_id, real_tray):
-                    if ui_dwdm is not None: self.tree.set(item_id, column="DWDM/T_ found", value="Y")
-                    commentary_parts.append("DWDM/Trunk Circuits found, DO NO USE. Ask IPNE Fibre Planning.")
-                    tags.append("cs_alert")
-
-                # --- 2. Database Checks (Only if DB available) ---
-                if cursor:
-                    clean_cable = val_cable.split("(")[0].strip()
-                    try:
-                        cable_data = self.fetch_cable_data(cursor, clean_cable)
-                    except Exception as e:
-                        cable_data = None
+                        allow_tray = bool(val_cd.strip()) or self.show_next_tray
+                        display_tray = real_tray if allow_tray else ""
+                        self.show_next_tray = bool(val_cd.strip())
+
+                        values = [
+                            _v(src_a), val_cable, _v(src_b), val_cd, _v(src_eo), _v(src_len),
+                            _v(src_tube), "", "", "", display_tray, "" 
+                        ]
+                        item_id = self.tree.insert("", "end", values=values)
+                        self.row_meta[item_id] = {"segment_id": seg_by_row_index.get(i, "")}
+
+                        tags = []
+                        commentary_parts = []
+
+                        # --- 1. DWDM/T_ Check ---
+                        seg_id = seg_by_row_index.get(i, "")
+                        if seg_id and real_tray and self.cs_cache.tray_has_alert(seg_id, real_tray):
+                            if ui_dwdm is not None: self.tree.set(item_id, column="DWDM/T_ found", value="Y")
+                            commentary_parts.append("DWDM/Trunk Circuits found, DO NO USE. Ask IPNE Fibre Planning.")
+                            tags.append("cs_alert")
+
+                        # --- 2. Database Checks (Only if DB available) ---
+                        if db_available:
+                            clean_cable = val_cable.split("(")[0].strip()
+                            cable_data = check_records['cables'].get(name_key(clean_cable))
                     
-                    if cable_data:
-                        is_iof = (str(cable_data.get('IOF', '')).strip().upper() == "Y") or self._name_marks_iof(clean_cable)
-                        if is_iof and ui_iof is not None:
-                             self.tree.set(item_id, column="IOF", value="Y")
-                             commentary_parts.append("Cable is IOF, ask permission.")
-
-                        status = cable_data.get('CABLE_STATUS', '')
-                        if "ZLS" in cable_data.get('NAME', '').upper() or status == "PD":
-                            commentary_parts.append("Cable is being decommissioned.")
-                        if status == "DF": commentary_parts.append("Cable is Defective.")
-                        if status == "PA": commentary_parts.append("Cable is New Build.")
-                        if cable_data.get('OWNER', '').upper() != "OPTUS":
-                            commentary_parts.append("Cable is not owned by Optus.")
-
-                # --- 3. Splice Checks (Only if DB available) ---
-                if cursor and val_cd.strip():
-                    b_clean = _v(src_b).split("@")[0].strip()
-                    try:
-                        splice_data = self.fetch_splicecase_data(cursor, b_clean)
-                    except Exception:
-                        splice_data = None
+                            if cable_data:
+                                if cable_data['IS_IOF'] and ui_iof is not None:
+                                     self.tree.set(item_id, column="IOF", value="Y")
+                                     commentary_parts.append("Cable is IOF, ask permission.")
+
+                                status = cable_data.get('CABLE_STATUS', '')
+                                if cable_data['IS_DECOMMISSIONING']:
+                                    commentary_parts.append("Cable is being decommissioned.")
+                                if status == "DF": commentary_parts.append("Cable is Defective.")
+                                if status == "PA": commentary_parts.append("Cable is New Build.")
+                                if cable_data['IS_FOREIGN_OWNED']:
+                                    commentary_parts.append("Cable is not owned by Optus.")
+
+                        # --- 3. Splice Checks (Only if DB available) ---
+                        if db_available and val_cd.strip():
+                            b_clean = _v(src_b).split("@")[0].strip()
+                            splice_data = check_records['splicecases'].get(name_key(b_clean))
                     
-                    if not splice_data:
-                        commentary_parts.append("Cannot splice at this Splice Case (or not found in DB)")
-                    else:
-                        rs_code = (splice_data.get('RS_CODE') or "").upper()
-                        if ui_rs is not None: self.tree.set(item_id, column="RS Type", value=rs_code)
-                        if (splice_data.get('BUTTSPLICE') or "").upper() == "Y": commentary_parts.append("Splice Case is Butt Splice")
+                            if not splice_data:
+                                commentary_parts.append("Cannot splice at this Splice Case (or not found in DB)")
+                            else:
+                                rs_code = (splice_data.get('RS_CODE') or "").upper()
+                                if ui_rs is not None: self.tree.set(item_id, column="RS Type", value=rs_code)
+                                if splice_data['IS_BUTT_SPLICE']: commentary_parts.append("Splice Case is Butt Splice")
                         
-                        restricted = (splice_data.get('RESTRICTED') or "").upper() == "Y"
-                        if restricted and rs_code != "RS-NO": commentary_parts.append(f"Splice Case is {rs_code}, ask permission.")
-                        elif rs_code == "RS-NO": commentary_parts.append(f"Splice Case is {rs_code}, DO NOT SPLICE.")
-                        elif rs_code == "RS-RB": commentary_parts.append(f"Splice Case is {rs_code}, DO NOT USE ring-barked tubes.")
-
-                        comm = (splice_data.get('RS_COMMENTS') or "").lower()
-                        mh = (splice_data.get('MANHOLE') or "").upper()
-                        if "substation" in comm: commentary_parts.append("In substation, avoid.")
-                        if "citipower" in comm or "CP_" in mh: commentary_parts.append("In citipower pit, avoid.")
-                        if "etsa" in comm or "ET_" in mh: commentary_parts.append("In ETSA pit, DO NOT SPLICE.")
-                        if "tunnel" in comm: commentary_parts.append("In tunnel, DO NOT SPLICE.")
-
-                # --- 4. Tube Mismatch ---
-                sel_type = (self.fibre_type.get() or "").strip()
-                row_tube = _v(src_tube).strip()
-                can2000 = {"Local", "Junction", "Trunk"}
-                if sel_type in can2000 and row_tube in can2000 and row_tube != sel_type:
-                    tags.append("tube_mismatch")
-                    if sel_type == "Local": commentary_parts.append(f"Tube is {row_tube}, expected Local.")
-                    elif sel_type == "Junction" and row_tube == "Trunk": commentary_parts.append("Tube is Trunk, expected Junction.")
-
-                if commentary_parts:
-                    full_text = "; ".join(commentary_parts)
-                    self.tree.set(item_id, column="Commentary", value=full_text)
-                if tags:
-                    self.tree.item(item_id, tags=tuple(tags))
-
-            if conn: conn.close()
-            self.adjust_column_widths()
-            self.log("Processing finished.")
+                                restricted = splice_data['IS_RESTRICTED']
+                                if restricted and rs_code != "RS-NO": commentary_parts.append(f"Splice Case is {rs_code}, ask permission.")
+                                elif rs_code == "RS-NO": commentary_parts.append(f"Splice Case is {rs_code}, DO NOT SPLICE.")
+                                elif rs_code == "RS-RB": commentary_parts.append(f"Splice Case is {rs_code}, DO NOT USE ring-barked tubes.")
+
+                                if splice_data['IN_SUBSTATION']: commentary_parts.append("In substation, avoid.")
+                                if splice_data['IN_CITIPOWER']: commentary_parts.append("In citipower pit, avoid.")
+                                if splice_data['IN_ETSA']: commentary_parts.append("In ETSA pit, DO NOT SPLICE.")
+                                if splice_data['IN_TUNNEL']: commentary_parts.append("In tunnel, DO NOT SPLICE.")
+
+                        # --- 4. Tube Mismatch ---
+                        sel_type = (self.fibre_type.get() or "").strip()
+                        row_tube = _v(src_tube).strip()
+                        can2000 = {"Local", "Junction", "Trunk"}
+                        if sel_type in can2000 and row_tube in can2000 and row_tube != sel_type:
+                            tags.append("tube_mismatch")
+                            if sel_type == "Local": commentary_parts.append(f"Tube is {row_tube}, expected Local.")
+                            elif sel_type == "Junction" and row_tube == "Trunk": commentary_parts.append("Tube is Trunk, expected Junction.")
+
+                        if commentary_parts:
+                            full_text = "; ".join(commentary_parts)
+                            self.tree.set(item_id, column="Commentary", value=full_text)
+                        if tags:
+                            self.tree.item(item_id, tags=tuple(tags))
+
+                    self.adjust_column_widths()
+                    self.log("Processing finished.")
+                except Exception as e:
+                    fail(e)
+
+            # the crawl runs on worker threads; the table is filled once its pages are in
+            if pending_crawl:
+                self._start_crawl(*pending_crawl, then=populate)
+            else:
+                populate()
 
         except Exception as e:
-            traceback.print_exc()
-            self.log(f"CRITICAL ERROR: {e}")
-            messagebox.showerror("Error", f"An error occurred: {e}")
-            # Ensure cleanup happens even on crash if temp file exists
-            if temp_csv_file and os.path.exists(temp_csv_file):
-                try: os.remove(temp_csv_file)
-                except: pass
+            fail(e)
 
-    def fetch_cable_data(self, cursor, cable_name):
-        query = """
-        SELECT NAME, CABLE_STATUS, OWNER, IOF, CONSTRUCT_TYPE, SEGMENT_ID
-        FROM Cable
-        WHERE UPPER(NAME) = UPPER(?)
-        LIMIT 1
+    def _start_crawl(self, to_crawl, trays_by_seg, then):
         """
-        cursor.execute(query, (cable_name.strip(),))
-        result = cursor.fetchone()
-        if result:
-            return {
-                'NAME': result[0],
-                'CABLE_STATUS': result[1] if result[1] else "",
-                'OWNER': result[2] if result[2] else "",
-                'IOF': result[3] if result[3] else "",
-                'CONSTRUCT_TYPE': result[4] if result[4] else "",
-                'SEGMENT_ID': result[5] if len(result) > 5 and result[5] else "",
-            }
-        return None
+        Fetch and parse the cross-sections in `to_crawl` on worker threads,
+        then call then() on the Tk thread. Progress comes back on a queue,
+        drained by _poll_crawl() so Tk stays responsive meanwhile.
+        """
+        self.log(f"Crawling {len(to_crawl)} cross-sections ({self.crawl_per_host} at a time)...")
+        self.progress["maximum"] = len(to_crawl)
+        self.progress["value"] = 0
+        self.progress_frame.grid(row=4, column=0, sticky="w", padx=6, pady=(4, 2))
+        self.process_button.config(state=tk.DISABLED)
+
+        events = queue.Queue()
+        crawler = threading.Thread(
+            target=crawl_cross_sections,
+            args=(to_crawl, self.cs_cache, trays_by_seg, events),
+            kwargs={"per_host": self.crawl_per_host},
+            daemon=True,
+        )
+        crawler.start()
+        self.parent.after(CRAWL_POLL_MS, self._poll_crawl, crawler, events, len(to_crawl), 0, then)
+
+    def _poll_crawl(self, crawler, events, total, done, then):
+        while done < total:
+            try:
+                seg_id, error = events.get_nowait()
+            except queue.Empty:
+                break
+            done += 1
+            if error:
+                self.log(f"Failed {seg_id}: {error}")
+            else:
+                self.log(f"Crawled {done}/{total}: {seg_id}")
+            self.progress["value"] = done
+        if done < total and (crawler.is_alive() or not events.empty()):
+            self.parent.after(CRAWL_POLL_MS, self._poll_crawl, crawler, events, total, done, then)
+            return
+
+        self.progress_frame.grid_remove()
+        self.process_button.config(state=tk.NORMAL)
+        self.log("Crawl complete.")
+        self.log(get_vmr_client().describe())
+        self.log(self.cs_cache.describe())
+        then()
 
+    def fetch_cable_data(self, cursor, cable_name):
+        query = f"SELECT {', '.join(CHECK_CABLE_COLUMNS)} FROM Cable WHERE NAME_KEY = ? ORDER BY rowid LIMIT 1"
+        cursor.execute(query, (name_key(cable_name),))
+        result = cursor.fetchone()
+        return cable_check_record(result) if result else None
 
     def fetch_splicecase_data(self, cursor, splice_name):
-        query = """
-        SELECT NAME, BUTTSPLICE, RESTRICTED, RS_CODE, RS_COMMENTS, MANHOLE
-        FROM SpliceCases
-        WHERE UPPER(NAME) = UPPER(?)
-        LIMIT 1
-        """
-        cursor.execute(query, (splice_name.strip(),))
+        query = f"SELECT {', '.join(CHECK_SPLICECASE_COLUMNS)} FROM SpliceCases WHERE NAME_KEY = ? ORDER BY rowid LIMIT 1"
+        cursor.execute(query, (name_key(splice_name),))
         result = cursor.fetchone()
-        if result:
-            return {
-                'NAME': result[0],
-                'BUTTSPLICE': result[1] if result[1] else "",
-                'RESTRICTED': result[2] if result[2] else "",
-                'RS_CODE': result[3] if result[3] else "",
-                'RS_COMMENTS': result[4] if result[4] else "",
-                'MANHOLE': result[5] if result[5] else "",
-            }
-        return None
+        return splicecase_check_record(result) if result else None
 
 ########################################################################
 # Main script to bring both tools together
@@ -2840,4 +5533,6 @@ def _parse_vmr_html(file_path):
                 pass
 
 if __name__ == "__main__":
+    # needed for the hashing process pool in frozen .exe builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
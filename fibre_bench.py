@@ -0,0 +1,835 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fibre Assistance benchmarks.
+
+Headless timings for the database paths of fibre_assistance.py, so changes
+can be compared before/after on a full-size database.db. Every benchmark
+prints a JSON result (and writes it to --out when given).
+
+    python fibre_bench.py lookups --db database.db
+    python fibre_bench.py geometry --db database.db
+    python fibre_bench.py spatial --db database.db
+    python fibre_bench.py search --db database.db --lengths 1 2 3 4 6
+    python fibre_bench.py download --size-mb 50
+    python fibre_bench.py pipeline --cable optus_fiber.geojson --splice SpliceCases.geojson
+    python fibre_bench.py ingest --sizes 10000 100000 1000000
+    python fibre_bench.py crawl --segments 40 --latency 0.5 --per-host 1 2 4 8
+    python fibre_bench.py ingest --sizes 1000000 --workers 1 2 4 8
+"""
+
+import argparse
+import email.utils
+import hashlib
+import http.server
+import json
+import math
+import os
+import queue
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+import cable_extract
+import fibre_assistance as fa
+
+# ---- Helpers ----------------------------------------------------------------
+
+def _latency_stats(samples):
+    """Summarise a list of durations (seconds) in milliseconds."""
+    ms = sorted(s * 1000.0 for s in samples)
+    if not ms:
+        return {"n": 0}
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+def _time_each(fn, items):
+    samples = []
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+def _report(args, result):
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+def _sample_names(conn, table, n):
+    cur = conn.execute(
+        f"SELECT NAME FROM {table} WHERE NAME IS NOT NULL ORDER BY RANDOM() LIMIT ?", (n,)
+    )
+    # vary the case the way names arrive from CSV / VMR traces
+    return [(name.lower() if i % 2 else name) for i, (name,) in enumerate(cur.fetchall())]
+
+# ---- Synthetic data ---------------------------------------------------------
+
+# (lon, lat, weight) of the metro areas the network clusters around
+_CITIES = (
+    (144.96, -37.81, 5), (151.21, -33.87, 5), (153.03, -27.47, 3), (115.86, -31.95, 2),
+    (138.60, -34.93, 2), (149.13, -35.28, 1), (147.33, -42.88, 1), (130.84, -12.46, 1),
+)
+_CABLE_PREFIXES = ("L", "LS", "FSS", "IOF", "DF")
+_EXCHANGES = ("MEL", "SYD", "BNE", "PER", "ADL", "CBR", "HOB", "DRW", "CLY", "PAR", "NSY")
+_JOINT_TYPES = ("AJL", "BJL", "FJL", "CJL", "MJL")
+_RS_COMMENTS = (
+    None, None, None, "", "Access via substation gate", "CitiPower pit - book access",
+    "ETSA asset, escort required", "In tunnel section", "Restricted - 24h notice",
+)
+
+def _synthetic_point(rng):
+    lon, lat, _ = rng.choices(_CITIES, weights=[c[2] for c in _CITIES])[0]
+    spread = rng.choice((0.05, 0.2, 0.8))
+    return lon + rng.gauss(0, spread), lat + rng.gauss(0, spread)
+
+def _synthetic_cable(rng, i):
+    lon, lat = _synthetic_point(rng)
+    # vertex counts are long-tailed: most spans are short, a few follow long routes
+    vertices = max(2, min(400, int(rng.lognormvariate(2.0, 0.9))))
+    heading = rng.uniform(0, 2 * math.pi)
+    coords = []
+    for _ in range(vertices):
+        coords.append([round(lon, 7), round(lat, 7)])
+        heading += rng.gauss(0, 0.4)
+        step = rng.uniform(0.0002, 0.002)
+        lon += step * math.cos(heading)
+        lat += step * math.sin(heading)
+    exchange = rng.choice(_EXCHANGES)
+    return {
+        "type": "Feature",
+        "properties": {
+            "NAME": f"{rng.choice(_CABLE_PREFIXES)}_{exchange}{i:07d}",
+            "CABLE_STATUS": rng.choice(("IS", "IS", "IS", "PD", "DF", "PA")),
+            "FIBRES": rng.choice((12, 24, 48, 96, 144, 288)),
+            "OWNER": rng.choice(("OPTUS", "OPTUS", "OPTUS", "TELSTRA", "NBN", "VOCUS")),
+            "SPAN_LENGTH": round(rng.uniform(5, 2500), 2),
+            "IOF": rng.choice(("Y", "N", "N", None)),
+            "PROTECTED": rng.choice(("Y", "N", "N")),
+            "LINK1": f"{exchange}_{rng.randrange(10 ** 6):06d}",
+            "LINK2": f"{exchange}_{rng.randrange(10 ** 6):06d}",
+            "EO": f"EO{rng.randrange(1, 40)}",
+            "ID": str(10 ** 7 + i),
+            "SEGMENT_ID": str(rng.randrange(10 ** 8)),
+            "BUILD_DATE": f"{rng.randrange(1995, 2025)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+            "CONSTRUCT_TYPE": rng.choice(("UG", "UG", "AE", "DB", "SUB")),
+        },
+        "geometry": {"type": "LineString", "coordinates": coords},
+    }
+
+def _synthetic_splice(rng, i):
+    lon, lat = _synthetic_point(rng)
+    exchange = rng.choice(_EXCHANGES)
+    return {
+        "type": "Feature",
+        "properties": {
+            "NAME": f"{rng.choice(_JOINT_TYPES)}_{exchange}{i:07d}",
+            "ADDRESS": f"{rng.randrange(1, 400)} {rng.choice(('High', 'Main', 'Station', 'Church'))} St",
+            "SUBURB": rng.choice(("RICHMOND", "PARRAMATTA", "FORTITUDE VALLEY", "NEWTOWN", "CARLTON")),
+            "BUTTSPLICE": rng.choice(("Y", "N", "N", "N")),
+            "RESTRICTED": rng.choice(("Y", "N", "N", "N")),
+            "RS_CODE": rng.choice((None, None, "RS-NO", "RS-RB", "RS-PE")),
+            "RS_COMMENTS": rng.choice(_RS_COMMENTS),
+            "MODEL": rng.choice(("FOSC-450", "TENIO-T3", "UCAO", "BPEO-1")),
+            "MANHOLE": rng.choice(("MH", "CP_", "ET_", "PIT")) + str(rng.randrange(10 ** 5)),
+            "OWNER": rng.choice(("OPTUS", "OPTUS", "TELSTRA")),
+            "VMR_LINK": f"https://cadprdwebw001.optus.com.au/vmr/{rng.randrange(10 ** 6)}",
+            "EO": f"EO{rng.randrange(1, 40)}",
+            "BUILDDATE": str(rng.randrange(1995, 2025)),
+            "JOBNUMBER": f"J{rng.randrange(10 ** 6):06d}",
+            "ID": str(2 * 10 ** 7 + i),
+        },
+        "geometry": {"type": "Point", "coordinates": [round(lon, 7), round(lat, 7)]},
+    }
+
+def write_synthetic_geojson(path, kind, count, seed=1):
+    """Stream a FeatureCollection of `count` synthetic 'cable' / 'splice' features to `path`."""
+    rng = random.Random(seed)
+    make = _synthetic_cable if kind == "cable" else _synthetic_splice
+    with open(path, "w", encoding="ascii") as f:
+        f.write('{\n"type": "FeatureCollection",\n"name": "%s",\n"features": [\n' % kind)
+        for i in range(count):
+            f.write(json.dumps(make(rng, i)))
+            f.write(",\n" if i < count - 1 else "\n")
+        f.write("]\n}\n")
+    return os.path.getsize(path)
+
+# ---- Benchmarks -------------------------------------------------------------
+
+def bench_lookups(args):
+    """Fibre Check name lookups: UPPER(NAME) = UPPER(?) scan vs NAME_KEY index."""
+    conn = sqlite3.connect(args.db)
+    fa.migrate_network_database(conn)
+    cur = conn.cursor()
+
+    result = {"benchmark": "lookups", "db": os.path.abspath(args.db)}
+    legacy_sql = {
+        "Cable": "SELECT NAME, CABLE_STATUS, OWNER, IOF, CONSTRUCT_TYPE, SEGMENT_ID "
+                 "FROM Cable WHERE UPPER(NAME) = UPPER(?) LIMIT 1",
+        "SpliceCases": "SELECT NAME, BUTTSPLICE, RESTRICTED, RS_CODE, RS_COMMENTS, MANHOLE "
+                       "FROM SpliceCases WHERE UPPER(NAME) = UPPER(?) LIMIT 1",
+    }
+    indexed = {
+        "Cable": fa.FibreProcessor.fetch_cable_data,
+        "SpliceCases": fa.FibreProcessor.fetch_splicecase_data,
+    }
+    for table in ("Cable", "SpliceCases"):
+        rows = cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        names = _sample_names(conn, table, args.samples)
+        # legacy scans are slow on national data; a smaller sample is enough
+        before = _time_each(
+            lambda n: cur.execute(legacy_sql[table], (n.strip(),)).fetchone(),
+            names[:args.legacy_samples],
+        )
+        after = _time_each(lambda n: indexed[table](None, cur, n), names)
+        result[table] = {
+            "rows": rows,
+            "before": _latency_stats(before),
+            "after": _latency_stats(after),
+        }
+
+    # a whole trace at once: set-based SQL resolver vs the in-memory catalogue
+    cables = _sample_names(conn, "Cable", args.trace_names)
+    splices = _sample_names(conn, "SpliceCases", args.trace_names)
+    conn.close()
+    reader = fa.network_reader(args.db)
+    catalogue = fa.network_catalogue(args.db)
+    catalogue.refresh()
+    with reader.reading() as rconn:
+        sql = _time_each(lambda _: fa.resolve_check_records(rconn.cursor(), cables, splices), range(20))
+    memory = _time_each(lambda _: catalogue.resolve(cables, splices), range(20))
+    result["trace"] = {
+        "names": len(cables) + len(splices),
+        "sql_resolver": _latency_stats(sql),
+        "catalogue": _latency_stats(memory),
+        "catalogue_load_seconds": round(catalogue.load_seconds, 3),
+        "catalogue_mb": round(catalogue.memory_bytes() / (1 << 20), 1),
+    }
+    fa.release_network_reader(args.db)
+    return result
+
+def bench_geometry(args):
+    """Stored geometry size and decode time: WKB blobs vs the old GeoJSON text."""
+    conn = sqlite3.connect(args.db)
+    fa.migrate_network_database(conn)
+    result = {
+        "benchmark": "geometry",
+        "db": os.path.abspath(args.db),
+        "db_bytes": os.path.getsize(args.db),
+    }
+    for table in ("Cable", "SpliceCases"):
+        blobs = [g for (g,) in conn.execute(
+            f"SELECT geometry FROM {table} WHERE geometry IS NOT NULL ORDER BY RANDOM() LIMIT ?",
+            (args.samples,)
+        )]
+        texts = [json.dumps(fa.decode_geometry(g)) for g in blobs]
+        rows, stored = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(length(geometry)), 0) FROM {table}"
+        ).fetchone()
+        wkb_sample = sum(len(g) for g in blobs) or 1
+        json_sample = sum(len(t.encode()) for t in texts)
+        result[table] = {
+            "rows": rows,
+            "wkb_bytes": stored,
+            # scaled from the sample
+            "json_bytes_estimate": int(stored * json_sample / wkb_sample),
+            "decode_json": _latency_stats(_time_each(json.loads, texts)),
+            "decode_wkb": _latency_stats(_time_each(fa.decode_geometry, blobs)),
+        }
+    conn.close()
+    extra = sum(result[t]["json_bytes_estimate"] - result[t]["wkb_bytes"] for t in ("Cable", "SpliceCases"))
+    result["db_bytes_json_estimate"] = result["db_bytes"] + extra
+    return result
+
+def bench_spatial(args):
+    """R*Tree bbox / within-distance / nearest-k query latency at random points."""
+    conn = sqlite3.connect(args.db)
+    fa.migrate_network_database(conn)
+    cur = conn.cursor()
+    result = {"benchmark": "spatial", "db": os.path.abspath(args.db)}
+    for table in ("Cable", "SpliceCases"):
+        min_lon, min_lat, max_lon, max_lat = cur.execute(
+            f"SELECT MIN(MIN_LON), MIN(MIN_LAT), MAX(MAX_LON), MAX(MAX_LAT) FROM {table}"
+        ).fetchone()
+        if min_lon is None:
+            continue
+        rng = random.Random(args.seed)
+        points = [(rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat))
+                  for _ in range(args.samples)]
+        half = args.box / 2.0
+        result[table] = {
+            "rows": cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0],
+            "indexed": cur.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (fa.SPATIAL_INDEXES[table],)
+            ).fetchone()[0] == 1,
+            "bbox": _latency_stats(_time_each(
+                lambda p: fa.query_bbox(cur, table, p[0] - half, p[1] - half, p[0] + half, p[1] + half),
+                points,
+            )),
+            "within": _latency_stats(_time_each(
+                lambda p: fa.query_within_distance(cur, table, p[0], p[1], args.metres), points
+            )),
+            "nearest": _latency_stats(_time_each(
+                lambda p: fa.query_nearest(cur, table, p[0], p[1], k=args.k), points
+            )),
+        }
+    conn.close()
+    return result
+
+def bench_search(args):
+    """cable_extract.fetch_rows keyword latency: FTS5 trigram index vs NAME_KEY scan, by keyword length."""
+    conn = sqlite3.connect(args.db)
+    fa.migrate_network_database(conn)
+    names = [n.upper() for n in _sample_names(conn, "Cable", args.samples)]
+    indexed = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (fa.NAME_SEARCH_INDEX,)
+    ).fetchone()[0] == 1
+    conn.close()
+
+    result = {"benchmark": "search", "db": os.path.abspath(args.db), "indexed": indexed, "lengths": {}}
+    rng = random.Random(args.seed)
+    for length in args.lengths:
+        # substrings of real names, so every keyword matches something
+        keywords = []
+        for name in names:
+            if len(name) >= length:
+                start = rng.randrange(len(name) - length + 1)
+                keywords.append(name[start:start + length])
+        matches = [len(cable_extract.fetch_rows(args.db, kw)) for kw in keywords]
+        result["lengths"][str(length)] = {
+            "keywords": len(keywords),
+            "median_rows": statistics.median(matches) if matches else 0,
+            # below three characters fetch_rows falls back to the scan on its own
+            "index": _latency_stats(_time_each(lambda kw: cable_extract.fetch_rows(args.db, kw), keywords)),
+            "scan": _latency_stats(_time_each(
+                lambda kw: cable_extract.fetch_rows(args.db, kw, use_index=False), keywords
+            )),
+        }
+    return result
+
+class _StandInHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves in-memory files the way the GeoJSON host does: ETag,
+    Last-Modified, If-None-Match / If-Modified-Since -> 304 and
+    Range + If-Range -> 206. `drop_after` cuts the next response short;
+    `rate` (bytes/s per response) simulates a slow proxy.
+    """
+    protocol_version = "HTTP/1.1"
+    files = {}
+    drop_after = None
+    rate = None
+    log = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        h = self.headers
+        if self.path not in cls.files:
+            self.send_error(404)
+            return
+        body, etag, last_modified = cls.files[self.path]
+        if h.get("If-None-Match") == etag or (
+            h.get("If-Modified-Since") == last_modified and not h.get("If-None-Match")
+        ):
+            cls.log.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = 0
+        rng = re.match(r"bytes=(\d+)-$", h.get("Range", ""))
+        if rng and h.get("If-Range", etag) in (etag, last_modified):
+            start = int(rng.group(1))
+            if start >= len(body):
+                cls.log.append(416)
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        status = 206 if start else 200
+        cls.log.append(status)
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Content-Length", str(len(body) - start))
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        end = len(body)
+        if cls.drop_after is not None:
+            end = min(end, start + cls.drop_after)
+            cls.drop_after = None
+            self.close_connection = True
+        step = 1 << 20 if not cls.rate else max(1024, cls.rate // 20)
+        view = memoryview(body)
+        t0 = time.perf_counter()
+        for i in range(start, end, step):
+            self.wfile.write(view[i:min(end, i + step)])
+            if cls.rate:
+                # pace to `rate` bytes/s
+                ahead = (i + step - start) / cls.rate - (time.perf_counter() - t0)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+def _stand_in_server(files, rate=None):
+    """Threaded local server for {path: bytes}; returns (server, handler class, base url)."""
+    stamp = email.utils.formatdate(time.time() - 3600, usegmt=True)
+    handler = type("Handler", (_StandInHandler,), {
+        "files": {
+            path: (body, '"%s"' % hashlib.md5(body).hexdigest(), stamp)
+            for path, body in files.items()
+        },
+        "rate": rate,
+        "log": [],
+    })
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler, f"http://127.0.0.1:{server.server_address[1]}"
+
+def _timed_download(url, dest, session):
+    errors = []
+    t0 = time.perf_counter()
+    ok = fa.download_file(url, dest, None, on_error=errors.append, session=session)
+    return ok, time.perf_counter() - t0, errors
+
+def bench_download(args):
+    """download_file against a local stand-in server: cold, 304 revalidation, resume."""
+    if args.file:
+        with open(args.file, "rb") as f:
+            body = f.read()
+    else:
+        body = os.urandom(args.size_mb << 20)
+    server, handler, base = _stand_in_server({"/optus_fiber.geojson": body})
+    url = base + "/optus_fiber.geojson"
+    workdir = tempfile.mkdtemp(prefix="fibre_bench_")
+    dest = os.path.join(workdir, "optus_fiber.geojson")
+    session = requests.Session()
+    result = {"benchmark": "download", "bytes": len(body)}
+
+    def same():
+        with open(dest, "rb") as f:
+            return f.read() == body
+
+    try:
+        # the old loop: whole file in 8 KB chunks every time
+        t0 = time.perf_counter()
+        with session.get(url, stream=True, timeout=10) as r, open(dest + ".legacy", "wb") as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                f.write(chunk)
+        legacy = time.perf_counter() - t0
+        result["legacy_8k"] = {"seconds": round(legacy, 4), "mb_s": round(len(body) / legacy / 1e6, 1)}
+
+        ok, secs, errors = _timed_download(url, dest, session)
+        result["cold"] = {"ok": ok and same(), "seconds": round(secs, 4),
+                          "mb_s": round(len(body) / secs / 1e6, 1), "errors": errors}
+
+        handler.log.clear()
+        ok, secs, errors = _timed_download(url, dest, session)
+        result["revalidate"] = {"ok": ok and same(), "statuses": list(handler.log),
+                                "seconds": round(secs, 4), "errors": errors}
+
+        os.remove(dest)
+        os.remove(dest + ".meta.json")
+        handler.log.clear()
+        handler.drop_after = len(body) * 2 // 5
+        first_ok, _, first_errors = _timed_download(url, dest, session)
+        part_bytes = os.path.getsize(dest + ".part") if os.path.exists(dest + ".part") else 0
+        ok, secs, errors = _timed_download(url, dest, session)
+        result["resume"] = {
+            "ok": (not first_ok) and ok and same(),
+            "statuses": list(handler.log),
+            "interrupted_at": part_bytes,
+            "seconds": round(secs, 4),
+            "errors": first_errors + errors,
+        }
+    finally:
+        server.shutdown()
+        session.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+class _NoTk:
+    """Stands in for the Tk parent, StringVar and messagebox: after() runs inline, output is recorded."""
+
+    def __init__(self):
+        self.messages = []
+
+    def after(self, _ms, fn):
+        fn()
+
+    def set(self, value):
+        self.messages.append(value)
+
+    def __getattr__(self, name):
+        # messagebox.showinfo / showerror / askyesno ...
+        return lambda *args, **kwargs: self.messages.append((name,) + args) or True
+
+def _headless_updater(workdir):
+    """FibreDatabaseUpdater working in `workdir` without building any Tk widgets."""
+    stub = _NoTk()
+    fa.messagebox = stub
+    updater = fa.FibreDatabaseUpdater.__new__(fa.FibreDatabaseUpdater)
+    updater.parent = stub
+    updater.download_progress_var = stub
+    updater.current_dir = workdir
+    updater.db_path = os.path.join(workdir, "database.db")
+    updater.cable_filename = "optus_fiber.geojson"
+    updater.splice_filename = "SpliceCases.geojson"
+    updater.update_file_status_labels = lambda: None
+    updater.PROXIES = None
+    return updater, stub
+
+def bench_pipeline(args):
+    """Download then Run Update vs Download & Update, against a throttled stand-in server."""
+    files = {}
+    for path, src in (("/optus_fiber.geojson", args.cable), ("/SpliceCases.geojson", args.splice)):
+        with open(src, "rb") as f:
+            files[path] = f.read()
+    server, handler, base = _stand_in_server(files, rate=int(args.rate_mb * 1e6))
+    result = {
+        "benchmark": "pipeline",
+        "bytes": {path: len(body) for path, body in files.items()},
+        "rate_mb_s": args.rate_mb,
+    }
+    try:
+        for mode in ("sequential", "pipelined"):
+            workdir = tempfile.mkdtemp(prefix="fibre_bench_")
+            updater, stub = _headless_updater(workdir)
+            updater.CABLE_URL = base + "/optus_fiber.geojson"
+            updater.SPLICE_URL = base + "/SpliceCases.geojson"
+            t0 = time.perf_counter()
+            if mode == "sequential":
+                updater.perform_downloads()
+                downloaded = time.perf_counter() - t0
+                updater.run_tool(
+                    os.path.join(workdir, updater.cable_filename),
+                    os.path.join(workdir, updater.splice_filename),
+                )
+            else:
+                try:
+                    stub.showinfo("Update Complete", updater.download_and_ingest())
+                except Exception as e:
+                    stub.showerror(*updater._ingest_error_dialog(e))
+            total = time.perf_counter() - t0
+            dialogs = [m for m in stub.messages if isinstance(m, tuple)]
+            with sqlite3.connect(updater.db_path) as conn:
+                rows = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                        for t in ("Cable", "SpliceCases")}
+            result[mode] = {
+                "seconds": round(total, 3),
+                "ok": bool(dialogs) and dialogs[-1][0] == "showinfo",
+                "rows": rows,
+            }
+            if mode == "sequential":
+                result[mode]["download_seconds"] = round(downloaded, 3)
+                result[mode]["ingest_seconds"] = round(total - downloaded, 3)
+            shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        server.shutdown()
+    return result
+
+class _PhaseTimer:
+    """Accumulates time spent inside wrapped generators / calls, by phase (inclusive)."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    def _add(self, phase, t0):
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + time.perf_counter() - t0
+
+    def generator(self, phase, fn):
+        def wrapper(*args, **kwargs):
+            it = iter(fn(*args, **kwargs))
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    self._add(phase, t0)
+                    return
+                self._add(phase, t0)
+                yield item
+        return wrapper
+
+    def call(self, phase, fn):
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._add(phase, t0)
+        return wrapper
+
+def bench_ingest_once(args):
+    """One headless ingest (run in a fresh process so peak RSS is its own)."""
+    timer = _PhaseTimer()
+    # each stage wraps the one before it, so inclusive times nest:
+    # read < parse < hash < upsert < ingest
+    fa._read_text_chunks = timer.generator("read", fa._read_text_chunks)
+    fa._iter_geojson_features_from_chunks = timer.generator("parse", fa._iter_geojson_features_from_chunks)
+    fa.prepare_feature_rows = timer.generator("hash", fa.prepare_feature_rows)
+    fa._bulk_upsert = timer.call("upsert", fa._bulk_upsert)
+    fa.stage_sharded_features = timer.call("shards", fa.stage_sharded_features)
+    if args.workers:
+        fa._default_hash_workers = lambda: args.workers
+
+    updater, stub = _headless_updater(args.workdir)
+    t0 = time.perf_counter()
+    updater.ingest(args.cable, args.splice, sharded=True if args.workers else False)
+    wall = time.perf_counter() - t0
+
+    inc = timer.seconds
+    phases = {
+        "read": inc.get("read", 0.0),
+        "parse": inc.get("parse", 0.0) - inc.get("read", 0.0),
+        "hash": inc.get("hash", 0.0) - inc.get("parse", 0.0),
+        # sharded runs: parse + hash in the pool, then ATTACH + copy into staging
+        "shards": inc.get("shards", 0.0),
+        "sql": inc.get("upsert", 0.0) - inc.get("hash", 0.0),
+        # migrations, R*Tree sync, commit, database swap
+        "finalize": wall - inc.get("upsert", 0.0) - inc.get("shards", 0.0),
+    }
+    peak = fa._peak_rss_bytes()
+    return {
+        "wall_seconds": round(wall, 3),
+        "phases_seconds": {k: round(v, 3) for k, v in phases.items()},
+        "peak_rss_mb": round(peak / (1 << 20), 1) if peak else None,
+        "db_bytes": os.path.getsize(updater.db_path),
+    }
+
+def _run_ingest_once(cable, splice, workdir, workers=None):
+    cmd = [sys.executable, os.path.abspath(__file__), "ingest-once",
+           "--cable", cable, "--splice", splice, "--workdir", workdir]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+def bench_ingest(args):
+    """
+    run_tool's ingest at several sizes on synthetic data: full build, then an
+    unchanged refresh. With --workers, also a sharded build per worker count.
+    """
+    result = {"benchmark": "ingest", "python": sys.version.split()[0],
+              "sqlite": sqlite3.sqlite_version, "cpus": os.cpu_count(), "sizes": {}}
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix="fibre_bench_", dir=args.workdir)
+        try:
+            cable = os.path.join(workdir, "optus_fiber.geojson")
+            splice = os.path.join(workdir, "SpliceCases.geojson")
+            splices = max(1, int(size * args.splice_ratio))
+            t0 = time.perf_counter()
+            cable_bytes = write_synthetic_geojson(cable, "cable", size, seed=args.seed)
+            splice_bytes = write_synthetic_geojson(splice, "splice", splices, seed=args.seed)
+            entry = {
+                "cable_features": size,
+                "splice_features": splices,
+                "input_bytes": cable_bytes + splice_bytes,
+                "generate_seconds": round(time.perf_counter() - t0, 3),
+            }
+            # first run builds database_new.db; the second is a delta with nothing changed
+            for run in ("build", "refresh"):
+                entry[run] = _run_ingest_once(cable, splice, workdir)
+                entry[run]["features_per_s"] = round(
+                    (size + splices) / entry[run]["wall_seconds"]) if entry[run]["wall_seconds"] else None
+            if args.workers:
+                entry["sharded_build"] = {}
+                for workers in args.workers:
+                    os.remove(os.path.join(workdir, "database.db"))
+                    run = _run_ingest_once(cable, splice, workdir, workers)
+                    base = entry["sharded_build"].get(str(args.workers[0]), run)["wall_seconds"]
+                    run["speedup"] = round(base / run["wall_seconds"], 2) if run["wall_seconds"] else None
+                    entry["sharded_build"][str(workers)] = run
+            result["sizes"][str(size)] = entry
+        finally:
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+class _StandInVMRHandler(http.server.BaseHTTPRequestHandler):
+    """CrossSectionReview.aspx stand-in: a GridView2 page per id after `latency` seconds."""
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    fibres = 144
+    in_flight = 0
+    peak_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak_in_flight = max(cls.peak_in_flight, cls.in_flight)
+        try:
+            time.sleep(self.latency)
+            seg = re.search(r"id=(\w+)", self.path)
+            seg = seg.group(1) if seg else "0"
+            rows = "".join(
+                "<tr><td>%d</td><td>%s</td><td>%s</td></tr>" % (
+                    n, ("T_%s_%d" % (seg, n)) if n % 37 == 0 else ("L_%s_%d" % (seg, n)),
+                    "DWDM-%d" % n if n % 53 == 0 else "B%d" % n)
+                for n in range(1, self.fibres + 1)
+            )
+            body = (
+                "<html><body><table id='GridView2'><tr><th>Fibre</th><th>OS Name</th>"
+                "<th>Bearer ID</th></tr>%s</table></body></html>" % rows
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+def bench_crawl(args):
+    """
+    Fibre Check cross-section crawl against a stand-in VMR server with
+    injected latency: the old one-at-a-time loop vs crawl_cross_sections()
+    at each per-host limit.
+    """
+    handler = type("Handler", (_StandInVMRHandler,), {"latency": args.latency})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/vmr/CrossSectionReview.aspx?id="
+    jobs = [(str(100000 + i), base + str(100000 + i)) for i in range(args.segments)]
+    trays = {seg: {"1-6", "37-42", "49-54"} for seg, _ in jobs}
+    workdir = tempfile.mkdtemp(prefix="fibre_bench_")
+    result = {"benchmark": "crawl", "segments": args.segments, "latency_s": args.latency, "runs": {}}
+    try:
+        # the old loop: bare requests.get per page, parsed on the same thread
+        cache = fa.CrossSectionCache(os.path.join(workdir, "legacy"))
+        t0 = time.perf_counter()
+        for seg, url in jobs:
+            resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
+            headers, rows = cache.put_html(seg, resp.text)
+            for t in trays[seg]:
+                cache.set_tray_alert(seg, t, fa.rows_have_alert(headers, fa.filter_rows_by_tray_range(rows, t)))
+        result["runs"]["sequential"] = {"seconds": round(time.perf_counter() - t0, 3)}
+        expected = {(seg, t): cache.tray_has_alert(seg, t) for seg, _ in jobs for t in trays[seg]}
+
+        for per_host in args.per_host:
+            cache = fa.CrossSectionCache(os.path.join(workdir, f"per_host_{per_host}"))
+            events = queue.Queue()
+            handler.peak_in_flight = 0
+            t0 = time.perf_counter()
+            fa.crawl_cross_sections(jobs, cache, trays, events, max_workers=max(args.per_host), per_host=per_host)
+            seconds = time.perf_counter() - t0
+            errors = []
+            while not events.empty():
+                seg, error = events.get_nowait()
+                if error:
+                    errors.append((seg, error))
+            result["runs"][f"per_host_{per_host}"] = {
+                "seconds": round(seconds, 3),
+                "speedup": round(result["runs"]["sequential"]["seconds"] / seconds, 2),
+                "peak_in_flight": handler.peak_in_flight,
+                "errors": errors,
+                "alerts_match": all(cache.tray_has_alert(seg, t) == flag for (seg, t), flag in expected.items()),
+            }
+        result["vmr_client"] = fa.get_vmr_client().stats()
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+# ---- Main -------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Fibre Assistance benchmarks")
+    parser.add_argument("--out", help="also write the JSON result to this file")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    p = sub.add_parser("lookups", help="Cable / SpliceCases name lookup latency")
+    p.add_argument("--db", default="database.db")
+    p.add_argument("--samples", type=int, default=500)
+    p.add_argument("--legacy-samples", type=int, default=50)
+    p.add_argument("--trace-names", type=int, default=100, help="cable and splice names per resolved trace")
+    p.set_defaults(func=bench_lookups)
+
+    p = sub.add_parser("geometry", help="geometry storage size and decode time")
+    p.add_argument("--db", default="database.db")
+    p.add_argument("--samples", type=int, default=5000)
+    p.set_defaults(func=bench_geometry)
+
+    p = sub.add_parser("spatial", help="bbox / within-distance / nearest-k query latency")
+    p.add_argument("--db", default="database.db")
+    p.add_argument("--samples", type=int, default=200)
+    p.add_argument("--box", type=float, default=0.02, help="bbox side in degrees")
+    p.add_argument("--metres", type=float, default=500.0)
+    p.add_argument("-k", type=int, default=5)
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_spatial)
+
+    p = sub.add_parser("search", help="cable_extract keyword search: FTS5 trigram index vs scan")
+    p.add_argument("--db", default="database.db")
+    p.add_argument("--samples", type=int, default=50)
+    p.add_argument("--lengths", type=int, nargs="+", default=[1, 2, 3, 4, 6])
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_search)
+
+    p = sub.add_parser("download", help="download_file against a local stand-in server")
+    p.add_argument("--size-mb", type=int, default=50)
+    p.add_argument("--file", help="serve this file instead of random bytes")
+    p.set_defaults(func=bench_download)
+
+    p = sub.add_parser("pipeline", help="Download then Run Update vs Download & Update")
+    p.add_argument("--cable", default="optus_fiber.geojson")
+    p.add_argument("--splice", default="SpliceCases.geojson")
+    p.add_argument("--rate-mb", type=float, default=5.0, help="stand-in server speed, MB/s per file")
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("crawl", help="cross-section crawl vs a stand-in VMR server with injected latency")
+    p.add_argument("--segments", type=int, default=40)
+    p.add_argument("--latency", type=float, default=0.5, help="seconds the stand-in server takes per page")
+    p.add_argument("--per-host", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.set_defaults(func=bench_crawl)
+
+    p = sub.add_parser("ingest", help="ingest scaling on synthetic GeoJSON (per phase, peak RSS)")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    p.add_argument("--splice-ratio", type=float, default=0.5, help="splice cases per cable")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--workdir", help="where to write the synthetic files (default: temp dir)")
+    p.add_argument("--keep", action="store_true", help="keep the generated files and databases")
+    p.add_argument("--workers", type=int, nargs="+",
+                   help="also time a sharded build with each of these process counts (speedup vs the first)")
+    p.set_defaults(func=bench_ingest)
+
+    p = sub.add_parser("ingest-once", help=argparse.SUPPRESS)
+    p.add_argument("--cable", required=True)
+    p.add_argument("--splice", required=True)
+    p.add_argument("--workdir", required=True)
+    p.add_argument("--workers", type=int)
+    p.set_defaults(func=bench_ingest_once)
+
+    args = parser.parse_args()
+    _report(args, args.func(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import fibre_assistance as fa
+
+
+def cable(name, lon, lat, **properties):
+    return {
+        "type": "Feature",
+        "properties": dict({"NAME": name, "OWNER": "OPTUS"}, **properties),
+        "geometry": {"type": "LineString", "coordinates": [[lon, lat], [lon + 1, lat + 1]]},
+    }
+
+
+@pytest.fixture
+def updater(tmp_path):
+    u = fa.FibreDatabaseUpdater.__new__(fa.FibreDatabaseUpdater)
+    u.current_dir = str(tmp_path)
+    u.db_path = os.path.join(str(tmp_path), "database.db")
+    u.EXPORT_COLUMNAR = False
+    yield u
+    fa.release_network_reader(u.db_path)
+
+
+def test_delta_refresh_keeps_spatial_index_in_line_with_rowids(updater):
+    updater.ingest([cable("A", 0, 0), cable("B", 10, 10)], None)
+    # B holds the highest rowid; C must not inherit it along with B's bbox
+    updater.ingest([cable("A", 0, 0), cable("C", 50, 50)], None)
+
+    with closing(sqlite3.connect(updater.db_path)) as conn:
+        if not fa._has_table(conn.cursor(), "CableIndex"):
+            pytest.skip("SQLite built without the rtree module")
+        rows = conn.execute("SELECT rowid, MIN_LON, MAX_LON, MIN_LAT, MAX_LAT FROM Cable").fetchall()
+        index = conn.execute("SELECT id, min_lon, max_lon, min_lat, max_lat FROM CableIndex").fetchall()
+        assert sorted(index) == sorted(rows)
+        assert [name for _, name in fa.query_bbox(conn.cursor(), "Cable", 49, 49, 52, 52)] == ["C"]
+        assert fa.query_bbox(conn.cursor(), "Cable", 9, 9, 12, 12) == []
+
+
+def test_reader_leaves_an_outdated_database_untouched(updater):
+    updater.ingest([cable("A", 0, 0)], None)
+    with closing(sqlite3.connect(updater.db_path)) as conn:
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+    with open(updater.db_path, "rb") as f:
+        before = f.read()
+
+    reader = fa.network_reader(updater.db_path)
+    with pytest.raises(fa.OutdatedDatabaseError):
+        reader.has_table("Cable")
+    with open(updater.db_path, "rb") as f:
+        assert f.read() == before
+
+
+def test_refreshes_in_the_same_instant_get_distinct_snapshots(updater, monkeypatch):
+    frozen = fa.datetime(2026, 1, 5, 9, 30, 0)
+
+    class FrozenDateTime(fa.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return frozen
+
+    monkeypatch.setattr(fa, "datetime", FrozenDateTime)
+    updater.ingest([cable("A", 0, 0, CABLE_STATUS="PA")], None)
+    updater.ingest([cable("A", 0, 0, CABLE_STATUS="IS")], None)
+
+    with closing(sqlite3.connect(updater.db_path)) as conn:
+        cursor = conn.cursor()
+        first, second = fa.list_snapshots(cursor)
+        assert first < second
+        as_of_first = fa.diff_snapshots(cursor, "Cable", "2000-01-01", first)
+        assert [row["CABLE_STATUS"] for row in as_of_first["added"]] == ["PA"]
+        changed = fa.diff_snapshots(cursor, "Cable", first, second)["changed"]
+        assert [c["changes"] for c in changed] == [{"CABLE_STATUS": ("PA", "IS")}]
+
+
+def test_columnar_export_keeps_numbers_numeric(updater, tmp_path):
+    pytest.importorskip("numpy")
+    updater.ingest([
+        cable("A", 0, 0, FIBRES=144, SPAN_LENGTH=120.5),
+        cable("B", 2, 2, FIBRES=24, SPAN_LENGTH="n/a"),
+        cable("C", 4, 4, FIBRES=None, SPAN_LENGTH=None),
+        cable("D", 6, 6, FIBRES="twelve", SPAN_LENGTH="80"),
+    ], None)
+
+    out_dir = os.path.join(str(tmp_path), fa.COLUMNAR_DIR)
+    manifest = fa.export_columnar_snapshot(updater.db_path, out_dir)
+    columns = manifest["tables"]["Cable"]["columns"]
+    assert columns["FIBRES"] == {"kind": "int64", "invalid": 1}
+    assert columns["SPAN_LENGTH"] == {"kind": "float64", "invalid": 1}
+
+    cables = fa.load_columnar_snapshot(out_dir)["Cable"]
+    names = [cables["NAME"].decode(i) for i in range(len(cables["NAME"]))]
+    fibres = dict(zip(names, cables["FIBRES"].tolist()))
+    assert fibres == {"A": 144, "B": 24, "C": fa.COLUMNAR_INT_NULL, "D": fa.COLUMNAR_INT_NULL}
+    assert sorted(f for f in fibres.values() if f != fa.COLUMNAR_INT_NULL) == [24, 144]
+    spans = dict(zip(names, cables["SPAN_LENGTH"].tolist()))
+    assert spans["A"] == 120.5 and spans["D"] == 80.0
+    assert spans["B"] != spans["B"] and spans["C"] != spans["C"]  # NaN
+
+
+CROSS_SECTION = (
+    "<table id='GridView2'><tr><th>Fibre</th><th>OS Name</th></tr>"
+    "<tr><td>1</td><td>T_TRUNK</td></tr><tr><td>2</td><td></td></tr></table>"
+)
+
+
+def test_cross_section_tables_are_reparsed_after_a_parser_change(tmp_path, monkeypatch):
+    cache = fa.CrossSectionCache(cache_dir=str(tmp_path))
+    cache.put_html("S1", CROSS_SECTION)
+    cache.set_tray_alert("S1", "1-1", True)
+    # what an older parser stored for the same page
+    cache._db.execute("UPDATE parsed_tables SET data = ?", (cache._pack_table(["Old"], [["stale"]]),))
+    cache.close()
+
+    monkeypatch.setattr(fa, "CS_PARSER_VERSION", fa.CS_PARSER_VERSION + 1)
+    cache = fa.CrossSectionCache(cache_dir=str(tmp_path))
+    try:
+        assert cache.table_for("S1") == (["Fibre", "OS Name"], [["1", "T_TRUNK"], ["2", ""]])
+        assert not cache.tray_has_alert("S1", "1-1")
+    finally:
+        cache.close()
+
+
+def test_put_html_still_returns_the_table_when_the_page_cannot_be_written(tmp_path, monkeypatch):
+    cache = fa.CrossSectionCache(cache_dir=str(tmp_path))
+    monkeypatch.setattr(cache, "_path_for", lambda seg_id: os.path.join(str(tmp_path), "missing", seg_id))
+    try:
+        assert cache.put_html("S1", CROSS_SECTION) == (["Fibre", "OS Name"], [["1", "T_TRUNK"], ["2", ""]])
+        assert not cache.has("S1")
+    finally:
+        cache.close()
+
+
+def test_repeated_names_resolve_to_the_lowest_rowid_everywhere(updater):
+    updater.ingest([
+        cable("DUP", 0, 0, CABLE_STATUS="PA"),
+        cable("DUP", 5, 5, CABLE_STATUS="DF"),
+        cable("DUP", 9, 9, CABLE_STATUS="IS"),
+    ], None)
+
+    with closing(sqlite3.connect(updater.db_path)) as conn:
+        cursor = conn.cursor()
+        assert cursor.execute("SELECT COUNT(*) FROM Cable").fetchone()[0] == 3
+        expected = cursor.execute("SELECT CABLE_STATUS FROM Cable ORDER BY rowid LIMIT 1").fetchone()[0]
+        key = fa.name_key("DUP")
+        resolved = fa.resolve_check_records(cursor, ["DUP"])["cables"][key]
+        single = fa.FibreProcessor.fetch_cable_data(None, cursor, "DUP")
+    catalogue = fa.NetworkCatalogue(updater.db_path)
+    catalogue.refresh()
+    from_memory = catalogue.resolve(["DUP"])["cables"][key]
+    assert resolved["CABLE_STATUS"] == single["CABLE_STATUS"] == from_memory["CABLE_STATUS"] == expected
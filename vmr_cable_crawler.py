@@ -19,12 +19,12 @@ from typing import List, Optional
 
 import requests
 from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from vmr_client import VMR_BASE, VMRClient, get_vmr_client
 
 # ---- Configuration ----------------------------------------------------------
 
-BASE_URL = "https://cadprdwebw001.optus.com.au/vmr"
+BASE_URL = VMR_BASE
 
 @dataclass
 class CableData:
@@ -43,31 +43,13 @@ class CableData:
 
 # ---- Connection Helpers -----------------------------------------------------
 
-def make_session(timeout=30, total_retries=3, backoff=0.5) -> requests.Session:
-    sess = requests.Session()
-    retries = Retry(
-        total=total_retries,
-        backoff_factor=backoff,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=["GET", "HEAD", "OPTIONS"],
-        raise_on_status=False,
-    )
-    adapter = HTTPAdapter(max_retries=retries, pool_connections=10, pool_maxsize=10)
-    sess.mount("http://", adapter)
-    sess.mount("https://", adapter)
-
-    sess.headers.update({
-        "User-Agent": "VMR-Cable-Analyzer/7.0",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    })
-    sess.request_timeout = timeout
-    return sess
-
-def get_html(session: requests.Session, url: str, params=None) -> str:
+def make_session() -> VMRClient:
+    # the process-wide pooled client; the user agent only applies if this creates it
+    return get_vmr_client(user_agent="VMR-Cable-Analyzer/7.0")
+
+def get_html(session: VMRClient, url: str, params=None) -> str:
     try:
-        r = session.get(url, params=params, timeout=session.request_timeout)
-        r.raise_for_status()
-        return r.text
+        return session.get_html(url, params=params, timeout=30)
     except requests.RequestException as e:
         print(f"  [!] HTTP Request failed: {e}")
         return ""
@@ -293,7 +275,7 @@ def calculate_stats(cable_data: CableData, tubes: List[List[dict]]):
 
 # ---- Main Process -----------------------------------------------------------
 
-def process_cable(session: requests.Session, cable_name: str) -> CableData:
+def process_cable(session: VMRClient, cable_name: str) -> CableData:
     data = CableData(name=cable_name)
     print(f"Processing: {cable_name}...", end=" ", flush=True)
 
@@ -398,6 +380,8 @@ def main():
         results.append(result)
         time.sleep(0.1) # Polite delay
 
+    print(session.describe())
+
     # Write Output CSV with specific headers and order
     headers = [
         "Cable Name",
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared VMR HTTP client.
+
+Every VMR page the tools fetch (Fibre Check cross sections and fibre
+traces, vmr_cable_crawler.py, app.py) goes through one VMRClient per
+process, so keep-alive connections and TLS sessions are reused across
+calls and threads, retries/backoff behave the same everywhere, and each
+request is timed.
+
+    from vmr_client import get_vmr_client
+    html = get_vmr_client().get_html(f"{VMR_BASE}/Result.aspx", params={...})
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---- Configuration ----------------------------------------------------------
+
+VMR_BASE = "https://cadprdwebw001.optus.com.au/vmr"
+
+VMR_USER_AGENT = "FibreAssist-VMR/1.0 (+python-requests)"
+# (connect, read); the read timeout is per socket read
+VMR_TIMEOUT = (10, 30)
+# connections kept open per host; at least the widest crawl thread pool
+VMR_POOL_SIZE = 16
+VMR_RETRIES = 3
+VMR_BACKOFF = 0.5
+VMR_RETRY_STATUSES = (429, 500, 502, 503, 504)
+# per-request timings kept for stats()
+VMR_TIMING_SAMPLES = 2000
+
+@dataclass
+class RequestTiming:
+    url: str
+    status: Optional[int]     # None when no response came back
+    seconds: float            # wall time including retries
+    size: int                 # response body bytes
+    error: str = ""
+
+# ---- Client -----------------------------------------------------------------
+
+class VMRClient:
+    """
+    Pooled requests.Session with unified retry/backoff and per-request timing.
+    Safe to share between threads.
+    """
+
+    def __init__(self, user_agent=VMR_USER_AGENT, timeout=VMR_TIMEOUT, pool_size=VMR_POOL_SIZE,
+                 retries=VMR_RETRIES, backoff=VMR_BACKOFF, samples=VMR_TIMING_SAMPLES):
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=VMR_RETRY_STATUSES,
+            allowed_methods=["GET", "HEAD", "OPTIONS"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        })
+        self._lock = threading.Lock()
+        self._timings = deque(maxlen=samples)
+        self._count = 0
+        self._errors = 0
+        self._seconds = 0.0
+
+    def get(self, url, params=None, timeout=None) -> requests.Response:
+        """GET through the shared pool; the response is returned whatever its status."""
+        start = time.perf_counter()
+        try:
+            resp = self.session.get(url, params=params, timeout=timeout or self.timeout, verify=True)
+        except requests.RequestException as e:
+            self._record(RequestTiming(url, None, time.perf_counter() - start, 0, str(e) or type(e).__name__))
+            raise
+        self._record(RequestTiming(resp.url, resp.status_code, time.perf_counter() - start, len(resp.content)))
+        return resp
+
+    def get_html(self, url, params=None, timeout=None) -> str:
+        """Page text; raises requests.HTTPError on a non-2xx status."""
+        resp = self.get(url, params=params, timeout=timeout)
+        resp.raise_for_status()
+        if "charset" not in resp.headers.get("Content-Type", "").lower():
+            resp.encoding = resp.apparent_encoding or "utf-8"
+        return resp.text
+
+    def _record(self, timing):
+        with self._lock:
+            self._timings.append(timing)
+            self._count += 1
+            self._seconds += timing.seconds
+            if timing.error or (timing.status or 0) >= 400:
+                self._errors += 1
+
+    def timings(self):
+        """Most recent RequestTiming records, oldest first."""
+        with self._lock:
+            return list(self._timings)
+
+    def stats(self) -> dict:
+        """Request count, failures and latency (ms) since the client was created."""
+        with self._lock:
+            count, errors, seconds = self._count, self._errors, self._seconds
+            recent = sorted(t.seconds for t in self._timings)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "requests": count,
+            "errors": errors,
+            "mean_ms": round(1000 * seconds / count, 1) if count else 0.0,
+            "p95_ms": round(1000 * p95, 1),
+        }
+
+    def describe(self) -> str:
+        s = self.stats()
+        return f"VMR: {s['requests']} requests, {s['errors']} failed, mean {s['mean_ms']} ms, p95 {s['p95_ms']} ms"
+
+    def close(self):
+        self.session.close()
+
+# ---- Process-wide instance --------------------------------------------------
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_vmr_client(**options) -> VMRClient:
+    """
+    The process-wide VMRClient, created on first use. `options` (VMRClient
+    keyword arguments) only apply to that first call.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = VMRClient(**options)
+        return _client
+
+def set_vmr_client(client: Optional[VMRClient]):
+    """Replace the process-wide client (None drops it); the old one is closed."""
+    global _client
+    with _client_lock:
+        old, _client = _client, client
+    if old is not None and old is not client:
+        old.close()